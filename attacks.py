@@ -0,0 +1,148 @@
+"""
+Инкрементальные карты атак: для каждой фигуры хранится битборд клеток, на которые она может пойти
+и взять стоящую там фигуру, и битборд клеток, от которых этот битборд зависит.
+После хода пересчитываются только фигуры на изменившихся клетках и те, чьи лучи или соседи их задевают.
+"""
+from bitboard import KING_ATTACKS, LEAPS, PAWN_CAPTURES, positions, slider_attacks
+from pieces import Pawn, Rook, Bishop, Queen, Mimic, Pegasus
+
+ALL_SQUARES = (1 << 64) - 1
+OTHER_COLOR = {'white': 'black', 'black': 'white'}
+SLIDER_TYPES = (Rook, Bishop, Queen, Pegasus)
+
+
+def piece_reach(board, square, piece):
+    """
+    Клетки, на которые фигура может пойти, если они заняты (без учёта цвета фигур).
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param square: (int) Номер клетки фигуры
+        :param piece: (object) Фигура
+
+    :return: (tuple) Битборд клеток и битборд клеток, от занятости которых он зависит
+    """
+    piece_type = type(piece)
+    if piece_type in SLIDER_TYPES:
+        reach = slider_attacks(square, board.occupied, piece.directions)
+        # Луч доходит до первой фигуры включительно, значит меняется только при изменении клеток на нём
+        return reach, reach
+    if piece_type == Pawn:
+        return PAWN_CAPTURES[piece.direction][square], 0
+    if piece_type == Mimic:
+        directions, reach, pawns = Mimic.copied_moves(board, square)
+        if directions:
+            reach |= slider_attacks(square, board.occupied, directions)
+        for pawn in pawns:
+            reach |= PAWN_CAPTURES[pawn.direction][square]
+        return reach, reach | KING_ATTACKS[square]
+    return LEAPS[piece.directions][square], 0
+
+
+class AttackTracker:
+    """
+    Карты атак доски. Board.set_square отмечает изменившиеся клетки (touch),
+    а пересчёт делается при следующем запросе (attacked), поэтому ходы перебора без запросов почти ничего не стоят.
+    """
+    def __init__(self):
+        self.reach = [0] * 64
+        self.depends = [0] * 64
+        # Фигуры, чьи атаки зависят от других клеток (дальнобойные и мимики)
+        self.dependent = 0
+        self.changed = ALL_SQUARES
+
+    def touch(self, bit):
+        """
+        Отметка изменившейся клетки.
+
+        :param bit: (int) Битборд клетки
+        """
+        self.changed |= bit
+
+    def reset(self):
+        """
+        Полный пересчёт при следующем запросе (после прямой записи в сетку).
+        """
+        self.changed = ALL_SQUARES
+
+    def snapshot(self):
+        """
+        Снимок карт атак для restore (вместе со снимком доски).
+
+        :return: (tuple) Атаки и зависимости по клеткам, зависимые фигуры и отмеченные клетки
+        """
+        return tuple(self.reach), tuple(self.depends), self.dependent, self.changed
+
+    def restore(self, snapshot):
+        """
+        Возврат к картам атак из снимка.
+
+        :param snapshot: (tuple) Снимок из AttackTracker.snapshot
+        """
+        reach, depends, self.dependent, self.changed = snapshot
+        self.reach, self.depends = list(reach), list(depends)
+
+    def sync(self, board):
+        """
+        Пересчёт атак фигур, затронутых изменениями с прошлого запроса.
+
+        Args:
+            :param board: (object) Текущее состояние доски
+        """
+        changed = self.changed
+        if not changed:
+            return
+        self.changed = 0
+
+        dirty = changed
+        dependent = self.dependent & ~changed
+        while dependent:
+            bit = dependent & -dependent
+            dependent ^= bit
+            if self.depends[bit.bit_length() - 1] & changed:
+                dirty |= bit
+
+        grid = board.board
+        for y, x in positions(dirty):
+            square = y * 8 + x
+            piece = grid[y][x]
+            if piece:
+                self.reach[square], self.depends[square] = piece_reach(board, square, piece)
+            else:
+                self.reach[square] = self.depends[square] = 0
+            if self.depends[square]:
+                self.dependent |= 1 << square
+            else:
+                self.dependent &= ~(1 << square)
+
+    def attacks(self, board, color):
+        """
+        Все клетки, на которые могут пойти с взятием фигуры данного цвета.
+
+        Args:
+            :param board: (object) Текущее состояние доски
+            :param color: (str) Цвет атакующих фигур
+
+        :return: (int) Битборд клеток
+        """
+        self.sync(board)
+        reach = self.reach
+        attacks = 0
+        pieces = board.colors[color]
+        while pieces:
+            bit = pieces & -pieces
+            pieces ^= bit
+            attacks |= reach[bit.bit_length() - 1]
+        return attacks
+
+    def attacked(self, board, color):
+        """
+        Фигуры данного цвета, которые соперник может взять следующим ходом (как Piece.under_attack).
+
+        Args:
+            :param board: (object) Текущее состояние доски
+            :param color: (str) Цвет фигур под боем
+
+        :return: (int) Битборд фигур под боем
+        """
+        return board.colors[color] & self.attacks(board, OTHER_COLOR[color])
@@ -0,0 +1,257 @@
+"""
+Пакетная обработка позиций на NumPy: N досок кодируются тензором плоскостей (N, 18, 8, 8)
+(по плоскости на каждый тип фигуры и цвет, включая мимика, пегаса и ниндзя), а материал,
+число атакованных клеток и подвижность прыгающих фигур (конь, король, ниндзя, пешка)
+считаются сдвигами и масками сразу для всех досок.
+
+Нужен NumPy (pip install numpy), остальной код без него работает.
+Сверка со скалярной логикой pieces.py на случайных позициях: python batch.py [--positions N]
+"""
+import argparse
+import random
+
+import numpy as np
+
+from bitboard import (ROOK_DIRECTIONS, BISHOP_DIRECTIONS, KNIGHT_DIRECTIONS, KING_DIRECTIONS, PEGASUS_DIRECTIONS,
+                      NINJA_DIRECTIONS)
+from board import Board, PIECE_TYPES, START_FEN
+from evaluation import PIECE_VALUES
+from movegen import generate_moves
+from pieces import Pawn, Rook, Knight, Bishop, Queen, King, Mimic, Pegasus, Ninja
+
+COLORS = ('white', 'black')
+# Порядок плоскостей тензора - как номера фигур в двоичной записи позиции (без пустой клетки)
+PLANES = PIECE_TYPES[1:]
+PLANE = {piece: index for index, piece in enumerate(PLANES)}
+WHITE_PLANES = [index for index, (piece_type, color) in enumerate(PLANES) if color == 'white']
+BLACK_PLANES = [index for index, (piece_type, color) in enumerate(PLANES) if color == 'black']
+PLANE_VALUES = np.array([PIECE_VALUES[piece_type] * (1 if color == 'white' else -1)
+                         for piece_type, color in PLANES], dtype=np.int64)
+LEAPER_TYPES = (Knight, King, Ninja, Pawn)
+
+
+def encode(boards):
+    """
+    Кодирование досок тензором плоскостей.
+
+    Args:
+        :param boards: (list) Доски
+
+    :return: (numpy.ndarray) Массив bool формы (N, 18, 8, 8): planes[n, PLANE[тип, цвет], y, x]
+    """
+    bitboards = np.array([[board.bitboards[piece] for piece in PLANES] for board in boards],
+                         dtype='<u8').reshape(len(boards), len(PLANES))
+    # Бит с номером y * 8 + x - это бит x байта y в записи little-endian
+    bits = np.unpackbits(bitboards.view(np.uint8), bitorder='little')
+    return bits.reshape(len(boards), len(PLANES), 8, 8).astype(bool)
+
+
+def shift(planes, dir_y, dir_x):
+    """
+    Сдвиг плоскостей на (dir_y, dir_x) клеток с обрезкой по краю доски.
+
+    Args:
+        :param planes: (numpy.ndarray) Массив формы (..., 8, 8)
+        :param dir_y: (int) Сдвиг по строкам
+        :param dir_x: (int) Сдвиг по столбцам
+
+    :return: (numpy.ndarray) Сдвинутый массив: result[..., y, x] = planes[..., y - dir_y, x - dir_x]
+    """
+    result = np.zeros_like(planes)
+    if abs(dir_y) > 7 or abs(dir_x) > 7:
+        return result
+    source_y = slice(max(0, -dir_y), 8 - max(0, dir_y))
+    target_y = slice(max(0, dir_y), 8 - max(0, -dir_y))
+    source_x = slice(max(0, -dir_x), 8 - max(0, dir_x))
+    target_x = slice(max(0, dir_x), 8 - max(0, -dir_x))
+    result[..., target_y, target_x] = planes[..., source_y, source_x]
+    return result
+
+
+def leaps(pieces, directions):
+    """
+    Клетки, на которые прыгают фигуры (объединение по всем фигурам).
+
+    :param pieces: (numpy.ndarray) Плоскости фигур (N, 8, 8)
+    :param directions: (tuple) Направления прыжка
+    :return: (numpy.ndarray) Плоскости клеток (N, 8, 8)
+    """
+    result = np.zeros_like(pieces)
+    for dir_y, dir_x in directions:
+        result |= shift(pieces, dir_y, dir_x)
+    return result
+
+
+def slides(pieces, occupied, directions):
+    """
+    Клетки, которые бьют дальнобойные фигуры: лучи до первой фигуры включительно.
+
+    :param pieces: (numpy.ndarray) Плоскости фигур (N, 8, 8)
+    :param occupied: (numpy.ndarray) Плоскости занятых клеток (N, 8, 8)
+    :param directions: (tuple) Направления хода
+    :return: (numpy.ndarray) Плоскости клеток (N, 8, 8)
+    """
+    result = np.zeros_like(pieces)
+    for dir_y, dir_x in directions:
+        ray = shift(pieces, dir_y, dir_x)
+        while ray.any():
+            result |= ray
+            ray = shift(ray & ~occupied, dir_y, dir_x)
+    return result
+
+
+def attacks(planes, color):
+    """
+    Клетки, на которые фигуры данного цвета могут пойти с взятием (как AttackTracker.attacks),
+    включая мимиков, которые перенимают ходы соседей любого цвета.
+
+    Args:
+        :param planes: (numpy.ndarray) Тензор плоскостей (N, 18, 8, 8)
+        :param color: (str) Цвет атакующих фигур
+
+    :return: (numpy.ndarray) Плоскости атакованных клеток (N, 8, 8)
+    """
+    def own(piece_type):
+        return planes[:, PLANE[piece_type, color]]
+
+    def both(*piece_types):
+        return np.logical_or.reduce([planes[:, PLANE[piece_type, side]]
+                                     for piece_type in piece_types for side in COLORS])
+
+    occupied = planes.any(axis=1)
+    mimics = own(Mimic)
+    # Мимики, у которых есть сосед данного вида
+    near = {kind: mimics & leaps(neighbours, KING_DIRECTIONS) for kind, neighbours in (
+        ('rook', both(Rook, Queen)), ('bishop', both(Bishop, Queen)), ('pegasus', both(Pegasus)),
+        ('knight', both(Knight)), ('king', both(King)),
+        ('white_pawn', planes[:, PLANE[Pawn, 'white']]), ('black_pawn', planes[:, PLANE[Pawn, 'black']]))}
+
+    result = slides(own(Rook) | own(Queen) | near['rook'], occupied, ROOK_DIRECTIONS)
+    result |= slides(own(Bishop) | own(Queen) | near['bishop'], occupied, BISHOP_DIRECTIONS)
+    result |= slides(own(Pegasus) | near['pegasus'], occupied, PEGASUS_DIRECTIONS)
+    result |= leaps(own(Knight) | near['knight'], KNIGHT_DIRECTIONS)
+    result |= leaps(own(King) | near['king'], KING_DIRECTIONS)
+    result |= leaps(own(Ninja), NINJA_DIRECTIONS)
+    for pawn_color, pawns in ((color, own(Pawn)), ('white', near['white_pawn']), ('black', near['black_pawn'])):
+        direction = Pawn(pawn_color).direction
+        result |= shift(pawns, direction, -1) | shift(pawns, direction, 1)
+    return result
+
+
+def leaper_mobility(planes, color):
+    """
+    Число ходов коней, королей, ниндзя и пешек данного цвета (без взятия на проходе).
+
+    Args:
+        :param planes: (numpy.ndarray) Тензор плоскостей (N, 18, 8, 8)
+        :param color: (str) Цвет фигур
+
+    :return: (numpy.ndarray) Число ходов для каждой доски (N,)
+    """
+    occupied = planes.any(axis=1)
+    free = ~planes[:, WHITE_PLANES if color == 'white' else BLACK_PLANES].any(axis=1)
+    count = np.zeros(len(planes), dtype=np.int64)
+    for piece_type, directions in ((Knight, KNIGHT_DIRECTIONS), (King, KING_DIRECTIONS), (Ninja, NINJA_DIRECTIONS)):
+        pieces = planes[:, PLANE[piece_type, color]]
+        for dir_y, dir_x in directions:
+            count += (shift(pieces, dir_y, dir_x) & free).sum(axis=(1, 2))
+
+    pawns = planes[:, PLANE[Pawn, color]]
+    direction = Pawn(color).direction
+    single = shift(pawns, direction, 0) & ~occupied
+    start_row = np.zeros((8, 8), dtype=bool)
+    start_row[Pawn.start_rows[color]] = True
+    double = shift(shift(pawns & start_row, direction, 0) & ~occupied, direction, 0) & ~occupied
+    captures = (shift(pawns, direction, -1) & occupied & free).sum(axis=(1, 2))
+    captures += (shift(pawns, direction, 1) & occupied & free).sum(axis=(1, 2))
+    return count + single.sum(axis=(1, 2)) + double.sum(axis=(1, 2)) + captures
+
+
+def evaluate(boards):
+    """
+    Признаки позиций пачкой.
+
+    Args:
+        :param boards: (list) Доски
+
+    :return: (dict) Массивы по доскам: 'material' (N,) - материал за белых минус чёрных,
+             'attacked' (N, 2) - число клеток, которые бьют белые и чёрные,
+             'threatened' (N, 2) - число фигур белых и чёрных под боем,
+             'mobility' (N, 2) - подвижность прыгающих фигур белых и чёрных
+    """
+    planes = encode(boards)
+    material = planes.sum(axis=(2, 3)) @ PLANE_VALUES
+    attacked = {color: attacks(planes, color) for color in COLORS}
+    pieces = {'white': planes[:, WHITE_PLANES].any(axis=1), 'black': planes[:, BLACK_PLANES].any(axis=1)}
+    return {
+        'material': material,
+        'attacked': np.stack([attacked[color].sum(axis=(1, 2)) for color in COLORS], axis=1),
+        'threatened': np.stack([(pieces[color] & attacked[other]).sum(axis=(1, 2))
+                                for color, other in zip(COLORS, reversed(COLORS))], axis=1),
+        'mobility': np.stack([leaper_mobility(planes, color) for color in COLORS], axis=1),
+    }
+
+
+def scalar_features(board):
+    """
+    Те же признаки одной доски по скалярной логике pieces.py (для сверки).
+
+    :param board: (object) Доска
+    :return: (tuple) Материал, атакованные клетки (белые, чёрные), фигуры под боем (белые, чёрные),
+             подвижность (белые, чёрные)
+    """
+    material = 0
+    mobility = {'white': 0, 'black': 0}
+    for index0, row in enumerate(board.board):
+        for index1, piece in enumerate(row):
+            if piece:
+                material += PIECE_VALUES[type(piece)] * (1 if piece.color == 'white' else -1)
+                if type(piece) in LEAPER_TYPES:
+                    mobility[piece.color] += sum(type(move[1]) != str
+                                                 for move in piece.get_possible_moves(board, (index0, index1)))
+    tracker = board.attack_tracker
+    return (material,
+            tuple(tracker.attacks(board, color).bit_count() for color in COLORS),
+            tuple(len(board.attack_map(color)) for color in COLORS),
+            tuple(mobility[color] for color in COLORS))
+
+
+def random_boards(count, seed=0):
+    """
+    Случайные позиции: случайные партии из стартовой позиции.
+
+    :param count: (int) Число позиций
+    :param seed: (int) Зерно генератора
+    :return: (list) Доски
+    """
+    generator = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = Board.from_fen(START_FEN)
+        for _ in range(generator.randint(0, 80)):
+            moves = generate_moves(board, board.state.turn)
+            if not moves:
+                break
+            board.make_move(*generator.choice(moves))
+        boards.append(board)
+    return boards
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Сверка пакетной оценки со скалярной логикой pieces.py.')
+    parser.add_argument('--positions', type=int, default=500, help='число случайных позиций')
+    arguments = parser.parse_args()
+
+    boards = random_boards(arguments.positions)
+    features = evaluate(boards)
+    mismatches = 0
+    for index, board in enumerate(boards):
+        expected = scalar_features(board)
+        got = (int(features['material'][index]), tuple(features['attacked'][index].tolist()),
+               tuple(features['threatened'][index].tolist()), tuple(features['mobility'][index].tolist()))
+        if got != expected:
+            mismatches += 1
+            print(board.to_fen(), 'пакетно:', got, 'по pieces.py:', expected)
+    print(f'Позиций: {len(boards)}, расхождений: {mismatches}')
+    if mismatches:
+        raise SystemExit(1)
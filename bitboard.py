@@ -0,0 +1,181 @@
+"""
+Битборды: множества клеток поля в виде 64-битных чисел и заранее посчитанные таблицы атак.
+Клетка (y, x) соответствует биту с номером y * 8 + x.
+"""
+
+SQUARES = tuple((square >> 3, square & 7) for square in range(64))
+
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (1, 1), (-1, 1), (1, -1))
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+KING_DIRECTIONS = QUEEN_DIRECTIONS
+KNIGHT_DIRECTIONS = ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+PEGASUS_DIRECTIONS = KNIGHT_DIRECTIONS
+NINJA_DIRECTIONS = ((2, 0), (-2, 0), (0, 2), (0, -2), (2, 2), (2, -2), (-2, 2), (-2, -2))
+
+
+def _ray(square, direction):
+    """
+    Луч из клетки в заданном направлении до края поля (сама клетка не входит).
+
+    Args:
+        :param square: (int) Номер клетки
+        :param direction: (tuple) Направление (dy, dx)
+
+    :return: (int) Битборд клеток луча
+    """
+    y, x = SQUARES[square]
+    dir_y, dir_x = direction
+    ray = 0
+    y, x = y + dir_y, x + dir_x
+    while -1 < y < 8 and -1 < x < 8:
+        ray |= 1 << (y * 8 + x)
+        y, x = y + dir_y, x + dir_x
+    return ray
+
+
+def _leaps(square, directions):
+    """
+    Клетки, на которые можно прыгнуть из данной клетки за один шаг в каждом из направлений.
+
+    Args:
+        :param square: (int) Номер клетки
+        :param directions: (tuple) Направления прыжка
+
+    :return: (int) Битборд клеток
+    """
+    y, x = SQUARES[square]
+    leaps = 0
+    for dir_y, dir_x in directions:
+        if -1 < y + dir_y < 8 and -1 < x + dir_x < 8:
+            leaps |= 1 << ((y + dir_y) * 8 + x + dir_x)
+    return leaps
+
+
+class _RayTables(dict):
+    """
+    Лучи по направлениям, недостающие строятся при первом обращении.
+    """
+    def __missing__(self, direction):
+        table = self[direction] = [_ray(square, direction) for square in range(64)]
+        return table
+
+
+class _LineTables(dict):
+    """
+    Все лучи группы направлений по клеткам, недостающие строятся при первом обращении.
+    """
+    def __missing__(self, group):
+        table = self[group] = [sum(RAYS[direction][square] for direction in group) for square in range(64)]
+        return table
+
+
+class _MimicReach(dict):
+    """
+    Клетки, куда мимик может достать ходом любой фигуры, по номеру клетки; строятся при первом обращении.
+    """
+    def __missing__(self, square):
+        reach = self[square] = (LINES[QUEEN_DIRECTIONS][square] | LINES[PEGASUS_DIRECTIONS][square] |
+                                KNIGHT_ATTACKS[square] | KING_ATTACKS[square])
+        return reach
+
+
+class _LeapTables(dict):
+    """
+    Таблицы прыжков по наборам направлений, недостающие строятся при первом обращении.
+    """
+    def __missing__(self, directions):
+        table = self[directions] = [_leaps(square, directions) for square in range(64)]
+        return table
+
+
+# RAYS[направление][клетка] - луч до края поля. Для направлений "вперёд" (номер клетки растёт)
+# ближайшая фигура на луче - младший бит, для остальных - старший.
+RAY_DIRECTIONS = QUEEN_DIRECTIONS + PEGASUS_DIRECTIONS
+RAYS = _RayTables()
+FORWARD = frozenset(direction for direction in RAY_DIRECTIONS if direction[0] * 8 + direction[1] > 0)
+
+LEAPS = _LeapTables()
+KNIGHT_ATTACKS = LEAPS[KNIGHT_DIRECTIONS]
+KING_ATTACKS = LEAPS[KING_DIRECTIONS]
+NINJA_ATTACKS = LEAPS[NINJA_DIRECTIONS]
+
+# PAWN_PUSHES[направление][клетка] - клетка на шаг вперёд, PAWN_CAPTURES - клетки для взятия по диагонали
+PAWN_PUSHES = {direction: LEAPS[((direction, 0),)] for direction in (-1, 1)}
+PAWN_CAPTURES = {direction: LEAPS[((direction, -1), (direction, 1))] for direction in (-1, 1)}
+
+# LINES[группа направлений][клетка] - все лучи группы на пустой доске: если цель не на них, дальнобойная
+# фигура до неё не достанет при любой расстановке. MIMIC_REACH - то же для всех ходов, которые может перенять мимик.
+LINES = _LineTables()
+MIMIC_REACH = _MimicReach()
+
+
+class _RowTable(dict):
+    """
+    Позиции (y, x) установленных битов строки y по байту строки, недостающие строятся при первом обращении.
+    """
+    def __init__(self, y):
+        super().__init__()
+        self.y = y
+
+    def __missing__(self, row_bits):
+        row = self[row_bits] = tuple((self.y, x) for x in range(8) if row_bits >> x & 1)
+        return row
+
+
+# ROW_POSITIONS[y][байт] - позиции (y, x) для установленных битов строки y
+ROW_POSITIONS = tuple(_RowTable(y) for y in range(8))
+
+
+def slider_attacks(square, occupied, directions):
+    """
+    Атаки дальнобойной фигуры: лучи до первой фигуры включительно.
+
+    Args:
+        :param square: (int) Номер клетки фигуры
+        :param occupied: (int) Битборд всех занятых клеток
+        :param directions: (tuple) Направления хода фигуры
+
+    :return: (int) Битборд клеток, куда может пойти фигура (без учёта цвета)
+    """
+    attacks = 0
+    for direction in directions:
+        rays = RAYS[direction]
+        ray = rays[square]
+        blockers = ray & occupied
+        if blockers:
+            if direction in FORWARD:
+                ray ^= rays[(blockers & -blockers).bit_length() - 1]
+            else:
+                ray ^= rays[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def positions(bitboard):
+    """
+    Перевод битборда в список позиций (y, x).
+
+    Args:
+        :param bitboard: (int) Битборд
+
+    :return: (list) Позиции установленных битов
+    """
+    result = []
+    while bitboard:
+        y = ((bitboard & -bitboard).bit_length() - 1) >> 3
+        result += ROW_POSITIONS[y][bitboard >> (y * 8) & 255]
+        bitboard &= ~(255 << (y * 8))
+    return result
+
+
+def first_position(bitboard):
+    """
+    Позиция младшего установленного бита.
+
+    Args:
+        :param bitboard: (int) Битборд
+
+    :return: (tuple) Позиция (y, x) или None, если битборд пуст
+    """
+    return SQUARES[(bitboard & -bitboard).bit_length() - 1] if bitboard else None
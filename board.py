@@ -1,12 +1,93 @@
-from pieces import Piece, Pawn, Rook, Knight, Bishop, Queen, King, Mimic, Pegasus, Ninja
+from attacks import AttackTracker
+from bitboard import first_position, positions
+from evaluation import SQUARE_SCORES, scan
+from movecache import MoveCache
+from movegen import legal_moves
+from pieces import Pawn, Rook, Knight, Bishop, Queen, King, Mimic, Pegasus, Ninja, PROMOTIONS
+from render import Renderer
+from zobrist import PIECE_KEYS, compute_hash, state_key
+
+# Символ фигуры на доске -> (тип фигуры, цвет)
+PIECE_SYMBOLS = {str(piece_type(color)): (piece_type, color)
+                 for piece_type in (Pawn, Rook, Knight, Bishop, Queen, King, Mimic, Pegasus, Ninja)
+                 for color in ('white', 'black')}
+# Номера фигур в двоичной записи позиции (0 - пустая клетка)
+PIECE_TYPES = (None,) + tuple(PIECE_SYMBOLS.values())
+PIECE_CODES = {piece: code for code, piece in enumerate(PIECE_TYPES) if piece}
+BINARY_SIZE = 44
+START_FEN = 'rnbqkbnr/jppppppj/g1m2m1g/8/8/G1M2M1G/JPPPPPPJ/RNBQKBNR w - 0'
+# Код превращения в записи хода: 0 - нет, дальше символы в порядке PROMOTIONS
+PROMOTION_CODES = (None,) + tuple(PROMOTIONS)
+
+
+def encode_move(move):
+    """
+    Запись хода в 15 бит (дебютная книга, история ходов): клетка начала, клетка конца (по 6 бит)
+    и код превращения (3 бита).
+
+    :param move: (tuple) Ход в формате (начало, конец, превращение)
+    :return: (int) Код хода
+    """
+    (start_y, start_x), (end_y, end_x), promotion = move
+    return start_y * 8 + start_x | (end_y * 8 + end_x) << 6 | PROMOTION_CODES.index(promotion) << 12
+
+
+def decode_move(code):
+    """
+    Ход по коду из encode_move (старшие биты кода не учитываются).
+
+    :param code: (int) Код хода
+    :return: (tuple) Ход в формате (начало, конец, превращение)
+    """
+    start, end = code & 63, code >> 6 & 63
+    return (start >> 3, start & 7), (end >> 3, end & 7), PROMOTION_CODES[code >> 12 & 7]
+
+
+class BoardState:
+    """
+    Состояние партии, которого не видно по расстановке фигур. Своё у каждой доски.
+    """
+    def __init__(self, turn='white', en_passant=None, move_count=0):
+        """
+        Args:
+            :param turn: (str) Цвет, который ходит
+            :param en_passant: (tuple) Позиция пешки, которая только что прошла через клетку
+                               (её можно взять на проходе), или None
+            :param move_count: (int) Количество сделанных ходов
+        """
+        self.turn = turn
+        self.en_passant = en_passant
+        self.move_count = move_count
+
 
 class Board:
     """
     Класс для поля.
+    Кроме сетки 8x8 хранит битборды: по одному числу на каждый тип и цвет фигуры,
+    битборды фигур каждого цвета и всех занятых клеток, хэш позиции по Зобристу (self.hash)
+    и оценку материала и таблиц фигура-клетка с точки зрения белых (self.score, см. evaluation.py).
+    Они обновляются вместе с сеткой.
     """
-    def __init__(self):
+    def __init__(self, setup=True, cache_size=256):
+        """
+        Args:
+            :param setup: (bool) Расставить ли фигуры на стартовые позиции (иначе доска пустая)
+            :param cache_size: (int) Размер кэша ходов и карт атак по позициям (0 - без кэша)
+        """
         self.board = [[None for _ in range(8)] for _ in range(8)]
-        self.setup_check_board()
+        self.bitboards = {(piece_type, color): 0
+                          for piece_type in (Pawn, Rook, Knight, Bishop, Queen, King, Mimic, Pegasus, Ninja)
+                          for color in ('white', 'black')}
+        self.colors = {'white': 0, 'black': 0}
+        self.occupied = 0
+        self.hash = 0
+        self.score = 0
+        self.move_cache = MoveCache(cache_size)
+        self.attack_tracker = AttackTracker()
+        self.move_stack = []
+        self.state = BoardState()
+        if setup:
+            self.setup_check_board()
 
     def setup_check_board(self):
         """
@@ -30,27 +111,54 @@ class Board:
         self.board[5][2], self.board[5][5] = Mimic('white'), Mimic('white')
         self.board[5][0], self.board[5][7] = Pegasus('white'), Pegasus('white')
         self.board[6][0], self.board[6][7] = Ninja('white'), Ninja('white')
-        print()
+        self.update_bitboards()
 
-    def display(self, color='white'):
+    def display(self, color='white', renderer=None):
         """
         Отображает доску, подсвечивая фигуры под боем жёлтым цветом.
 
         Args:
             :param color: (str) Цвет фигур, которых нужно подсветить
+            :param renderer: (object) Вывод в терминал (по умолчанию - полный кадр в стандартный вывод)
         """
-        print('   A B C D E F G H')
-        print(' +—————————————————+')
-        for index0, row in enumerate(self.board):
-            print(f'{8 - index0}|', end=' ')
-            for index1, piece in enumerate(row):
-                if (index0, index1) in Piece.under_attack(self, color):
-                    print(f'\x1B[1;43m{piece if piece else '.'}\x1B[0m', end=' ')
-                else:
-                    print(f'{piece if piece else '.'}', end=' ')
-            print(f'|{8 - index0}')
-        print(' +—————————————————+')
-        print('   A B C D E F G H')
+        (renderer or Renderer()).draw(self, attacked=self.attack_map(color))
+
+    def attack_map(self, color):
+        """
+        Позиции фигур данного цвета, которые находятся под боем.
+        Атаки пересчитываются только для фигур, затронутых ходами (AttackTracker),
+        а результат хранится в кэше по хэшу позиции (self.move_cache).
+
+        Args:
+            :param color: (str) Цвет, для которого нужно найти все фигуры под ударом
+
+        :return: (frozenset) позиции всех фигур под ударом
+        """
+        return self.move_cache.lookup((self.hash, 'attacked', color),
+                                      lambda: frozenset(positions(self.attack_tracker.attacked(self, color))))
+
+    def possible_moves(self, position):
+        """
+        Псевдолегальные ходы фигуры (как get_possible_moves) из кэша по хэшу позиции.
+
+        Args:
+            :param position: (tuple) Позиция фигуры
+
+        :return: (tuple) Ходы фигуры (пустой кортеж, если клетка пуста)
+        """
+        y, x = position
+        piece = self.board[y][x]
+        if not piece:
+            return ()
+        return self.move_cache.lookup((self.hash, y * 8 + x), lambda: tuple(piece.get_possible_moves(self, position)))
+
+    def legal_moves(self):
+        """
+        Легальные ходы того, кто ходит (как movegen.legal_moves), из кэша по хэшу позиции.
+
+        :return: (tuple) Ходы в формате (начало, конец, фигура для превращения пешки или None)
+        """
+        return self.move_cache.lookup((self.hash, 'legal'), lambda: tuple(legal_moves(self)))
 
     def get_piece(self, position):
         """
@@ -61,10 +169,224 @@ class Board:
 
         :return: (object) Фигура на указанной позиции
         """
-        if type(position[1]) == str:
-            y, x = position[0]
-        else: y, x = position
-        return self.board[y][x] if self.is_valid_position(position) else None
+        y, x = position
+        if type(x) == str:
+            y, x = y
+        return self.board[y][x] if -1 < y < 8 and -1 < x < 8 else None
+
+    def update_bitboards(self):
+        """
+        Пересчёт всех битбордов, хэша и оценки по сетке self.board и self.state (после прямой записи в них).
+        """
+        for key in self.bitboards:
+            self.bitboards[key] = 0
+        self.colors = {'white': 0, 'black': 0}
+        self.occupied = 0
+        for index0, row in enumerate(self.board):
+            for index1, piece in enumerate(row):
+                if piece:
+                    bit = 1 << (index0 * 8 + index1)
+                    self.bitboards[type(piece), piece.color] |= bit
+                    self.colors[piece.color] |= bit
+                    self.occupied |= bit
+        self.hash = compute_hash(self)
+        self.score = scan(self)
+        self.attack_tracker.reset()
+
+    def snapshot(self):
+        """
+        Снимок позиции для restore: клетки плоским кортежем из 64 ссылок (фигуры неизменяемы и общие,
+        поэтому сами они не копируются), битборды, хэш, оценка, состояние партии, стек ходов и карты атак.
+
+        :return: (tuple) Снимок
+        """
+        state = self.state
+        return (tuple(piece for row in self.board for piece in row), dict(self.bitboards), dict(self.colors),
+                self.occupied, self.hash, self.score, (state.turn, state.en_passant, state.move_count),
+                tuple(self.move_stack), self.attack_tracker.snapshot())
+
+    def restore(self, snapshot):
+        """
+        Возврат к позиции из снимка (один снимок можно восстанавливать сколько угодно раз).
+        Кэш ходов не сбрасывается: его ключи - хэши позиций.
+
+        Args:
+            :param snapshot: (tuple) Снимок из Board.snapshot
+        """
+        squares, bitboards, colors, self.occupied, self.hash, self.score, state, move_stack, attacks = snapshot
+        for index0, row in enumerate(self.board):
+            row[:] = squares[index0 * 8:index0 * 8 + 8]
+        self.bitboards = dict(bitboards)
+        self.colors = dict(colors)
+        self.state.turn, self.state.en_passant, self.state.move_count = state
+        self.move_stack = list(move_stack)
+        self.attack_tracker.restore(attacks)
+
+    def copy(self):
+        """
+        Независимая копия доски (вместо copy.deepcopy, которая копирует сетку и фигуры по одной).
+
+        :return: (object) Доска с той же позицией, стеком ходов и картами атак и своим пустым кэшем ходов
+        """
+        board = type(self)(setup=False, cache_size=self.move_cache.size)
+        board.restore(self.snapshot())
+        return board
+
+    def to_fen(self):
+        """
+        Запись позиции в формате FEN: строки доски сверху вниз через '/' (цифра - число пустых клеток подряд,
+        мимик - M/m, пегас - G/g, ниндзя - J/j), чей ход (w/b), клетка, через которую прошла пешка
+        (её можно взять на проходе), или '-', и число сделанных ходов.
+
+        :return: (str) Запись позиции, например 'rnbqkbnr/jppppppj/g1m2m1g/8/8/G1M2M1G/JPPPPPPJ/RNBQKBNR w - 0'
+        """
+        rows = []
+        for row in self.board:
+            text = ''
+            empty = 0
+            for piece in row:
+                if piece:
+                    text += f'{empty or ''}{piece.symbol}'
+                    empty = 0
+                else:
+                    empty += 1
+            rows.append(f'{text}{empty or ''}')
+
+        en_passant = '-'
+        if self.state.en_passant:
+            y, x = self.state.en_passant
+            # Пешка прошла через клетку позади себя
+            en_passant = self.indices_to_position((y + 1 if y == 4 else y - 1, x))
+        return f"{'/'.join(rows)} {self.state.turn[0]} {en_passant} {self.state.move_count}"
+
+    @classmethod
+    def from_fen(cls, fen):
+        """
+        Создание доски по записи из Board.to_fen.
+
+        Args:
+            :param fen: (str) Запись позиции
+
+        :return: (object) Доска
+        """
+        fields = fen.split()
+        if len(fields) != 4:
+            raise ValueError(f'В записи позиции должно быть 4 поля, а не {len(fields)}: {fen}')
+        placement, turn, en_passant, move_count = fields
+        rows = placement.split('/')
+        if len(rows) != 8:
+            raise ValueError(f'В записи позиции должно быть 8 строк, а не {len(rows)}: {fen}')
+        for row in rows:
+            for symbol in row:
+                if symbol not in PIECE_SYMBOLS and symbol not in '12345678':
+                    raise ValueError(f'Неизвестный символ {symbol!r} в записи позиции: {fen}')
+            if sum(int(symbol) if symbol in '12345678' else 1 for symbol in row) != 8:
+                raise ValueError(f'В строке {row!r} должно быть 8 клеток: {fen}')
+        if turn not in ('w', 'b'):
+            raise ValueError(f'Ход должен быть w или b, а не {turn!r}: {fen}')
+        if en_passant != '-' and (len(en_passant) != 2 or en_passant[0] not in 'abcdefgh' or en_passant[1] not in '36'):
+            raise ValueError(f'Некорректная клетка взятия на проходе {en_passant!r}: {fen}')
+        if not (move_count.isascii() and move_count.isdigit()):
+            raise ValueError(f'Число ходов должно быть неотрицательным целым, а не {move_count!r}: {fen}')
+
+        board = cls(setup=False)
+        for index0, row in enumerate(rows):
+            index1 = 0
+            for symbol in row:
+                if symbol.isdigit():
+                    index1 += int(symbol)
+                    continue
+                piece_type, color = PIECE_SYMBOLS[symbol]
+                board.board[index0][index1] = piece_type(color)
+                index1 += 1
+
+        if en_passant == '-':
+            en_passant = None
+        else:
+            y, x = cls.position_to_indices(en_passant)
+            en_passant = (y - 1 if y == 5 else y + 1, x)
+        board.state = BoardState('white' if turn == 'w' else 'black', en_passant, int(move_count))
+        board.update_bitboards()
+        return board
+
+    def to_bytes(self):
+        """
+        Двоичная запись позиции фиксированной длины (BINARY_SIZE байт): по 5 бит на клетку
+        (номер фигуры в PIECE_TYPES, 0 - пусто), байт состояния (чей ход, есть ли взятие на проходе и столбец пешки)
+        и 3 байта числа ходов.
+
+        :return: (bytes) Запись позиции
+        """
+        squares = 0
+        for row in self.board:
+            for piece in row:
+                squares = squares << 5 | (PIECE_CODES[type(piece), piece.color] if piece else 0)
+        flags = 1 if self.state.turn == 'black' else 0
+        if self.state.en_passant:
+            flags |= 2 | self.state.en_passant[1] << 2
+        return squares.to_bytes(40, 'big') + bytes((flags,)) + self.state.move_count.to_bytes(3, 'big')
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Создание доски по записи из Board.to_bytes.
+
+        Args:
+            :param data: (bytes) Запись позиции
+
+        :return: (object) Доска
+        """
+        if len(data) != BINARY_SIZE:
+            raise ValueError(f'Длина записи позиции должна быть {BINARY_SIZE} байта, а не {len(data)}')
+        squares = int.from_bytes(data[:40], 'big')
+        codes = [squares >> (63 - square) * 5 & 31 for square in range(64)]
+        for square, code in enumerate(codes):
+            if code >= len(PIECE_TYPES):
+                raise ValueError(f'Неизвестный номер фигуры {code} на клетке {square} в записи позиции')
+        flags = data[40]
+        # Старшие биты не используются, столбец пешки записывается только вместе с флагом взятия на проходе
+        if flags >> 5 or not flags & 2 and flags >> 2:
+            raise ValueError(f'Некорректный байт состояния {flags:#04x} в записи позиции')
+
+        board = cls(setup=False)
+        for square, code in enumerate(codes):
+            if code:
+                piece_type, color = PIECE_TYPES[code]
+                board.board[square >> 3][square & 7] = piece_type(color)
+
+        turn = 'black' if flags & 1 else 'white'
+        # Взять на проходе можно только пешку соперника, которая только что сделала двойной ход
+        en_passant = (4 if turn == 'black' else 3, flags >> 2 & 7) if flags & 2 else None
+        board.state = BoardState(turn, en_passant, int.from_bytes(data[41:], 'big'))
+        board.update_bitboards()
+        return board
+
+    def set_square(self, y, x, piece):
+        """
+        Запись фигуры в клетку с обновлением битбордов, хэша, оценки и отметкой для карт атак (без сброса кэшей).
+
+        Args:
+            :param y: (int) Строка
+            :param x: (int) Столбец
+            :param piece: (object) Фигура или None
+        """
+        square = y * 8 + x
+        bit = 1 << square
+        old = self.board[y][x]
+        if old:
+            self.bitboards[type(old), old.color] ^= bit
+            self.colors[old.color] ^= bit
+            self.occupied ^= bit
+            self.hash ^= PIECE_KEYS[type(old), old.color][square]
+            self.score -= SQUARE_SCORES[type(old), old.color][square]
+        if piece:
+            self.bitboards[type(piece), piece.color] |= bit
+            self.colors[piece.color] |= bit
+            self.occupied |= bit
+            self.hash ^= PIECE_KEYS[type(piece), piece.color][square]
+            self.score += SQUARE_SCORES[type(piece), piece.color][square]
+        self.board[y][x] = piece
+        self.attack_tracker.touch(bit)
 
     def place_piece(self, position, piece):
         """
@@ -75,7 +397,7 @@ class Board:
             :param piece: (object) Фигура, которую нужно поставить
         """
         y, x = position
-        self.board[y][x] = piece
+        self.set_square(y, x, piece)
 
     def move_piece(self, start, end):
         """
@@ -91,47 +413,95 @@ class Board:
         if type(self.board[start_y][start_x]) == Pawn:
             if not self.board[end_y][end_x] and start_x != end_x:
                 piece = self.board[start_y][start_x]
-                self.board[end_y][end_x] = piece
-                self.board[start_y][start_x] = None
-                if self.get_piece(end).color == 'white':
-                    self.board[end_y + 1][end_x] = None
-                else: self.board[end_y - 1][end_x] = None
+                self.set_square(end_y, end_x, piece)
+                self.set_square(start_y, start_x, None)
+                if piece.color == 'white':
+                    self.set_square(end_y + 1, end_x, None)
+                else: self.set_square(end_y - 1, end_x, None)
                 return
 
         piece = self.get_piece(start)
-        self.board[end_y][end_x] = piece
-        self.board[start_y][start_x] = None
+        self.set_square(end_y, end_x, piece)
+        self.set_square(start_y, start_x, None)
 
-    def find_king(self, color):
+    def make_move(self, start, end, promotion=None):
         """
-        Поиск позиции, на которой стоит король.
+        Выполнение хода по правилам Game.start (обмен мимика, взятие на проходе, превращение пешки)
+        с сохранением записи для отмены в self.move_stack.
+        Запись: (начало, конец, фигура, взятая фигура, где она стояла, превращение, обмен мимика,
+        прежняя пешка для взятия на проходе). Также передаёт ход и увеличивает счётчик ходов в self.state.
 
-        :param color: (str) Цвет искомого короля
-        :return: (int) Координаты короля
-        """
-        for index0, row in enumerate(self.board):
-            for index1, piece in enumerate(row):
-                if piece:
-                    if type(piece) == King:
-                        if piece.color == color:
-                            return index0, index1
+        Args:
+            :param start: (tuple) Начальная позиция
+            :param end: (tuple) Конечная позиция
+            :param promotion: (str) Символ фигуры для превращения пешки ('R', 'B', 'Q', 'N') или None
 
-    @staticmethod
-    def is_valid_position(position):
+        :return: (object) Взятая фигура или None
         """
-        Проверка корректности введенных координат (не выходят ли они за пределы поля)
+        start_y, start_x = start
+        end_y, end_x = end
+        piece = self.board[start_y][start_x]
+        captured = self.board[end_y][end_x]
+        captured_at = end
+        swap = type(piece) == Mimic
 
-        Args:
-            :param position: (tuple) координаты позиции
+        if swap:
+            self.set_square(start_y, start_x, captured)
+            self.set_square(end_y, end_x, piece)
+            captured = None
+        else:
+            if type(piece) == Pawn and not captured and start_x != end_x:
+                captured_at = (start_y, end_x)
+                captured = self.board[start_y][end_x]
+                self.set_square(start_y, end_x, None)
+            self.set_square(start_y, start_x, None)
+            if type(piece) == Pawn and promotion in PROMOTIONS and (end_y == 0 or end_y == 7):
+                self.set_square(end_y, end_x, PROMOTIONS[promotion](piece.color))
+            else:
+                promotion = None
+                self.set_square(end_y, end_x, piece)
+
+        state = self.state
+        self.move_stack.append((start, end, piece, captured, captured_at, promotion, swap, state.en_passant))
+        self.hash ^= state_key(state)
+        state.en_passant = end if type(piece) == Pawn and abs(end_y - start_y) == 2 else None
+        state.turn = 'black' if state.turn == 'white' else 'white'
+        state.move_count += 1
+        self.hash ^= state_key(state)
+        return captured
+
+    def unmake_move(self):
+        """
+        Отмена последнего хода, сделанного make_move.
 
-        :return: (bool) истина если координаты существуют в пределах доски и ложь в противном случае
+        :return: (tuple) Запись отменённого хода
         """
-        if type(position[1]) == str:
-            y, x = position[0]
-        else: y, x = position
-        return -1 < y < 8 and -1 < x < 8
+        record = self.move_stack.pop()
+        (start_y, start_x), (end_y, end_x), piece, captured, captured_at, promotion, swap, en_passant = record
+
+        if swap:
+            self.set_square(end_y, end_x, self.board[start_y][start_x])
+        else:
+            self.set_square(end_y, end_x, None)
+            self.set_square(captured_at[0], captured_at[1], captured)
+        self.set_square(start_y, start_x, piece)
 
+        state = self.state
+        self.hash ^= state_key(state)
+        state.en_passant = en_passant
+        state.turn = 'black' if state.turn == 'white' else 'white'
+        state.move_count -= 1
+        self.hash ^= state_key(state)
+        return record
+
+    def find_king(self, color):
+        """
+        Поиск позиции, на которой стоит король.
 
+        :param color: (str) Цвет искомого короля
+        :return: (int) Координаты короля
+        """
+        return first_position(self.bitboards[King, color])
 
     @staticmethod
     def position_to_indices(position):
@@ -150,6 +520,18 @@ class Board:
         y = ord(letter) - ord('a')
         return x, y
 
+    @staticmethod
+    def indices_to_position(indices):
+        """
+        Преобразование индексов массива в шахматную позицию.
+
+        Args:
+            :param indices: (tuple) Индексы строки и столбца, например (4, 4)
+
+        :return: (str) Позиция в формате 'e4'
+        """
+        return f"{chr(ord('a') + indices[1])}{8 - indices[0]}"
+
 if __name__ == "__main__":
     board = Board()
     board.display()
\ No newline at end of file
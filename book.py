@@ -0,0 +1,145 @@
+"""
+Дебютная книга: лучшие ходы для позиций первых полуходов партии из стартовой расстановки
+(Board.setup_check_board), посчитанные заранее перебором Engine на фиксированную глубину.
+
+Файл книги - заголовок и записи (хэш позиции по Зобристу, ход, оценка), отсортированные по хэшу.
+Файл открывается через mmap, и запись ищется двоичным поиском прямо в нём, без загрузки.
+Хэши зависят от ключей zobrist.py, поэтому при их изменении книгу нужно построить заново.
+
+Построение: python book.py [--plies N] [--depth D] [--output book.bin]
+"""
+import argparse
+import mmap
+import struct
+import time
+
+from board import Board, START_FEN, encode_move, decode_move
+from engine import Engine
+from movegen import legal_moves
+
+HEADER = struct.Struct('<4sI')
+# Оценка - 4 байта со знаком: оценки матов (около engine.MATE) не помещаются в 2 байта
+ENTRY = struct.Struct('<QHi')
+MAGIC = b'MBK2'
+
+
+class OpeningBook:
+    """
+    Дебютная книга в файле, открытом через mmap.
+    """
+    def __init__(self, data):
+        """
+        Args:
+            :param data: (object) Байты файла книги (mmap или bytes)
+        """
+        magic, self.count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('Это не файл дебютной книги или книга старого формата (её нужно построить заново)')
+        self.data = data
+
+    def __len__(self):
+        return self.count
+
+    def key(self, index):
+        """
+        Хэш позиции в записи с данным номером.
+
+        :param index: (int) Номер записи
+        :return: (int) Хэш
+        """
+        return ENTRY.unpack_from(self.data, HEADER.size + index * ENTRY.size)[0]
+
+    def lookup(self, board):
+        """
+        Ход из книги для позиции на доске.
+
+        Args:
+            :param board: (object) Текущее состояние доски
+
+        :return: (tuple) Ход в формате (начало, конец, превращение) и его оценка для того, кто ходит,
+                 или None, если позиции в книге нет
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key(middle) < board.hash:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count:
+            return None
+        key, move, score = ENTRY.unpack_from(self.data, HEADER.size + low * ENTRY.size)
+        return (decode_move(move), score) if key == board.hash else None
+
+    @classmethod
+    def open(cls, path):
+        """
+        Открытие файла книги через mmap.
+
+        :param path: (str) Путь к файлу
+        :return: (object) Книга
+        """
+        with open(path, 'rb') as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def build(plies=3, depth=3, log=None):
+    """
+    Построение книги: все позиции, которые получаются из стартовой за меньшее чем plies число полуходов
+    (любыми легальными ходами), и лучший ход в каждой по перебору на глубину depth.
+
+    Args:
+        :param plies: (int) Сколько первых полуходов партии покрывает книга
+        :param depth: (int) Глубина перебора для каждой позиции
+        :param log: (function) Функция для вывода хода построения или None
+
+    :return: (dict) Хэш позиции -> (ход, оценка для того, кто ходит)
+    """
+    engine = Engine(time_limit=None, max_depth=depth)
+    board = Board.from_fen(START_FEN)
+    entries = {}
+    level = [board.to_bytes()]
+    for ply in range(plies):
+        started = time.perf_counter()
+        next_level = []
+        for data in level:
+            board = Board.from_bytes(data)
+            if board.hash in entries:
+                continue
+            move, score, _ = engine.search(board)
+            if move is None:
+                continue
+            entries[board.hash] = (move, score)
+            if ply + 1 < plies:
+                for reply in legal_moves(board):
+                    board.make_move(*reply)
+                    next_level.append(board.to_bytes())
+                    board.unmake_move()
+        if log:
+            log(f'Полуход {ply + 1}: {len(entries)} позиций в книге, {time.perf_counter() - started:.1f} s')
+        level = next_level
+    return entries
+
+
+def save(entries, path):
+    """
+    Запись книги в файл.
+
+    Args:
+        :param entries: (dict) Хэш позиции -> (ход, оценка), как из build
+        :param path: (str) Путь к файлу
+    """
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, len(entries)))
+        for key in sorted(entries):
+            move, score = entries[key]
+            file.write(ENTRY.pack(key, encode_move(move), score))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Построение дебютной книги.')
+    parser.add_argument('--plies', type=int, default=3, help='сколько первых полуходов покрывает книга')
+    parser.add_argument('--depth', type=int, default=3, help='глубина перебора для каждой позиции')
+    parser.add_argument('--output', default='book.bin', help='файл книги')
+    arguments = parser.parse_args()
+    save(build(arguments.plies, arguments.depth, print), arguments.output)
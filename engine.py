@@ -0,0 +1,515 @@
+"""
+Компьютерный соперник: перебор альфа-бета с итеративным углублением, таблицей транспозиций,
+сортировкой ходов (сначала взятия, затем ходы-убийцы) и ограничением времени на ход.
+Позиции оцениваются по материалу и таблицам фигура-клетка (evaluation.evaluate).
+
+Внутри перебора ходы генерируются псевдолегальными, а ход, после которого свой король под боем,
+отбрасывается уже после того, как до него дошла очередь (до многих ходов её не доходит из-за отсечений).
+
+Если движку даны дебютная книга (book.py) или таблицы эндшпилей (tablebase.py), ход в известной позиции
+берётся из них без перебора.
+
+ParallelEngine делит ходы корня между процессами (позиция передаётся двоичной записью Board.to_bytes).
+Замер ускорения на 1..N процессах: python engine.py --workers N [--depth D]
+"""
+import os
+import time
+
+from board import Board
+from evaluation import PIECE_VALUES, evaluate
+from movegen import generate_moves, legal_moves, in_check
+from pieces import Pawn, Mimic
+import profiling
+from tablebase import probe
+
+MATE = 100000
+INFINITY = MATE + 1
+# Сколько раз подряд в переборе взятий перебираются ответы на шах (шахи могут идти по кругу)
+QUIESCENCE_EVASIONS = 1
+# Оценки не меньше MATE_BOUND по модулю - мат через (MATE - |оценка|) полуходов от корня
+MATE_BOUND = MATE - 1000
+
+# Вид оценки в таблице транспозиций
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class SearchTimeout(Exception):
+    """
+    Время на ход закончилось, перебор прерывается.
+    """
+
+
+class TranspositionTable:
+    """
+    Таблица транспозиций фиксированного размера. Запись на место занятой делается, если она из нового
+    перебора или посчитана не менее глубоко, чем старая.
+    Оценки матов хранятся как расстояние до мата от самой позиции, а не от корня: позиция может встретиться
+    на другом расстоянии от корня, и при чтении оценка пересчитывается обратно.
+    """
+    def __init__(self, size=1 << 16):
+        """
+        Args:
+            :param size: (int) Количество записей (степень двойки)
+        """
+        self.mask = size - 1
+        self.entries = [None] * size
+        self.generation = 0
+
+    def get(self, key, ply=0):
+        """
+        Поиск записи для позиции.
+
+        Args:
+            :param key: (int) Хэш позиции
+            :param ply: (int) Расстояние позиции от корня в полуходах (для оценок матов)
+
+        :return: (tuple) Запись (хэш, глубина, оценка, вид оценки, лучший ход, поколение) или None
+        """
+        entry = self.entries[key & self.mask]
+        if not entry or entry[0] != key:
+            return None
+        score = entry[2]
+        if score >= MATE_BOUND:
+            return entry[:2] + (score - ply,) + entry[3:]
+        if score <= -MATE_BOUND:
+            return entry[:2] + (score + ply,) + entry[3:]
+        return entry
+
+    def put(self, key, depth, score, flag, move, ply=0):
+        """
+        Сохранение результата перебора позиции.
+
+        Args:
+            :param key: (int) Хэш позиции
+            :param depth: (int) Глубина перебора
+            :param score: (int) Оценка
+            :param flag: (int) Вид оценки: EXACT, LOWER (не меньше) или UPPER (не больше)
+            :param move: (tuple) Лучший ход
+            :param ply: (int) Расстояние позиции от корня в полуходах (для оценок матов)
+        """
+        if score >= MATE_BOUND:
+            score += ply
+        elif score <= -MATE_BOUND:
+            score -= ply
+        index = key & self.mask
+        entry = self.entries[index]
+        if entry is None or entry[5] != self.generation or depth >= entry[1]:
+            self.entries[index] = (key, depth, score, flag, move, self.generation)
+
+    def new_search(self):
+        """
+        Начало нового перебора: старые записи становятся менее ценными при замене.
+        """
+        self.generation += 1
+
+
+class Engine:
+    """
+    Движок, который ищет лучший ход в позиции за заданное время.
+    """
+    def __init__(self, time_limit=0.1, max_depth=32, table_size=1 << 16, book=None, tablebases=None):
+        """
+        Args:
+            :param time_limit: (float) Время на ход в секундах (None - без ограничения)
+            :param max_depth: (int) Наибольшая глубина перебора
+            :param table_size: (int) Размер таблицы транспозиций
+            :param book: (object) Дебютная книга (book.OpeningBook) или None
+            :param tablebases: (dict) Таблицы эндшпилей (материал -> tablebase.Tablebase) или None
+        """
+        self.book = book
+        self.tablebases = tablebases or {}
+        self.table_pieces = max((len(table.pieces) for table in self.tablebases.values()), default=0)
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.table = TranspositionTable(table_size)
+        self.killers = []
+        self.deadline = 0
+        self.nodes = 0
+
+    def search(self, board):
+        """
+        Итеративное углубление: перебор на глубину 1, 2, ... пока не кончится время.
+
+        Args:
+            :param board: (object) Текущее состояние доски
+
+        :return: (tuple) Лучший ход, его оценка и глубина последнего законченного перебора
+        """
+        self.deadline = time.perf_counter() + self.time_limit if self.time_limit is not None else float('inf')
+        self.nodes = 0
+        self.table.new_search()
+        moves = legal_moves(board)
+        if not moves:
+            return None, 0, 0
+        known = self.known_move(board, moves)
+        if known:
+            return known
+        best_move, best_score, depth_done = moves[0], 0, 0
+
+        for depth in range(1, self.max_depth + 1):
+            self.killers = [[None, None] for _ in range(depth + 1)]
+            try:
+                score, move = self.root(board, depth, moves)
+            except SearchTimeout:
+                break
+            best_move, best_score, depth_done = move, score, depth
+            if abs(score) >= MATE - self.max_depth:
+                break
+        return best_move, best_score, depth_done
+
+    def best_move(self, board):
+        """
+        Лучший ход в позиции.
+
+        :param board: (object) Текущее состояние доски
+        :return: (tuple) Ход в формате (начало, конец, превращение) или None, если ходов нет
+        """
+        return self.search(board)[0]
+
+    def known_move(self, board, moves):
+        """
+        Ход из дебютной книги или по таблицам эндшпилей (самый быстрый мат, самая долгая защита).
+
+        Args:
+            :param board: (object) Текущее состояние доски
+            :param moves: (list) Легальные ходы
+
+        :return: (tuple) Ход, его оценка и глубина 0 или None, если позиции нет ни в книге, ни в таблицах
+        """
+        if self.book is not None:
+            found = self.book.lookup(board)
+            if found and found[0] in moves:
+                return found[0], found[1], 0
+
+        if not self.table_pieces or board.occupied.bit_count() > self.table_pieces:
+            return None
+        best = None
+        for move in moves:
+            board.make_move(*move)
+            try:
+                result = probe(self.tablebases, board)
+            finally:
+                board.unmake_move()
+            if result is None:
+                return None
+            outcome, plies = result
+            score = 0 if outcome == 'draw' else MATE - plies - 1 if outcome == 'loss' else plies + 1 - MATE
+            if best is None or score > best[1]:
+                best = move, score, 0
+        return best
+
+    def root(self, board, depth, moves):
+        """
+        Перебор корня: все ходы с полным окном, лучший найденный ход перебирается первым.
+
+        :return: (tuple) Оценка и лучший ход
+        """
+        alpha = -INFINITY
+        best_move = None
+        entry = self.table.get(board.hash)
+        for move in self.order(board, moves, 0, entry[4] if entry else None):
+            board.make_move(*move)
+            try:
+                score = -self.alpha_beta(board, depth - 1, -INFINITY, -alpha, 1)
+            finally:
+                board.unmake_move()
+            if score > alpha:
+                alpha, best_move = score, move
+        self.table.put(board.hash, depth, alpha, EXACT, best_move)
+        return alpha, best_move
+
+    def alpha_beta(self, board, depth, alpha, beta, ply):
+        """
+        Перебор альфа-бета в форме negamax.
+
+        Args:
+            :param board: (object) Текущее состояние доски
+            :param depth: (int) Оставшаяся глубина
+            :param alpha: (int) Нижняя граница окна
+            :param beta: (int) Верхняя граница окна
+            :param ply: (int) Расстояние от корня в полуходах
+
+        :return: (int) Оценка позиции с точки зрения того, кто ходит
+        """
+        self.nodes += 1
+        if time.perf_counter() > self.deadline:
+            raise SearchTimeout
+
+        entry = self.table.get(board.hash, ply)
+        table_move = None
+        if entry:
+            table_move = entry[4]
+            if entry[1] >= depth:
+                score, flag = entry[2], entry[3]
+                if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                    return score
+
+        if depth <= 0:
+            return self.quiescence(board, alpha, beta, ply)
+
+        color = board.state.turn
+        original_alpha = alpha
+        best_move = None
+        searched = 0
+        for move in self.order(board, generate_moves(board, color), ply, table_move):
+            capture = self.is_capture(board, move)
+            board.make_move(*move)
+            try:
+                if in_check(board, color):
+                    continue
+                searched += 1
+                score = -self.alpha_beta(board, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.unmake_move()
+            if score > alpha:
+                alpha, best_move = score, move
+                if alpha >= beta:
+                    if not capture and ply < len(self.killers) and move != self.killers[ply][0]:
+                        self.killers[ply] = [move, self.killers[ply][0]]
+                    break
+
+        if not searched:
+            return -MATE + ply if in_check(board, color) else 0
+
+        flag = EXACT if original_alpha < alpha < beta else (LOWER if alpha >= beta else UPPER)
+        self.table.put(board.hash, depth, alpha, flag, best_move, ply)
+        return alpha
+
+    def quiescence(self, board, alpha, beta, ply, evasions=QUIESCENCE_EVASIONS):
+        """
+        Перебор только взятий, чтобы не оценивать позицию посреди размена.
+        Под шахом статическая оценка не годится: перебираются все ответы на шах, а если их нет - это мат.
+        Ответы на шах перебираются не больше evasions раз за ветку, дальше под шахом проверяется только мат.
+
+        :return: (int) Оценка позиции с точки зрения того, кто ходит
+        """
+        color = board.state.turn
+        checked = in_check(board, color)
+        if checked:
+            moves = legal_moves(board, color)
+            if not moves:
+                return -MATE + ply
+            if not evasions:
+                return evaluate(board)
+            evasions -= 1
+        else:
+            stand_pat = evaluate(board)
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = [move for move in generate_moves(board, color) if self.is_capture(board, move)]
+
+        for move in self.order(board, moves, ply):
+            board.make_move(*move)
+            try:
+                # Ответы на шах уже легальные, взятия проверяются после хода
+                if not checked and in_check(board, color):
+                    continue
+                score = -self.quiescence(board, -beta, -alpha, ply + 1, evasions)
+            finally:
+                board.unmake_move()
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+    @staticmethod
+    def is_capture(board, move):
+        """
+        Является ли ход взятием (обмен мимика взятием не считается).
+
+        :return: (bool) истина, если ход берёт фигуру соперника
+        """
+        start, end, _ = move
+        piece = board.board[start[0]][start[1]]
+        target = board.board[end[0]][end[1]]
+        if type(piece) == Mimic:
+            return False
+        if target:
+            return target.color != piece.color
+        return type(piece) == Pawn and start[1] != end[1]
+
+    def order(self, board, moves, ply, table_move=None):
+        """
+        Сортировка ходов: ход из таблицы транспозиций, взятия (сначала самой ценной фигуры самой дешёвой),
+        ходы-убийцы, остальные.
+
+        :return: (list) Отсортированные ходы
+        """
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+
+        def priority(move):
+            if move == table_move:
+                return -INFINITY
+            start, end, promotion = move
+            if self.is_capture(board, move):
+                target = board.board[end[0]][end[1]]
+                victim = PIECE_VALUES[type(target)] if target else PIECE_VALUES[Pawn]
+                return -10 * victim + PIECE_VALUES[type(board.board[start[0]][start[1]])] - MATE
+            if move in killers:
+                return -MATE // 2
+            return 0
+
+        return sorted(moves, key=priority)
+
+
+# Движок процесса-исполнителя: создаётся один раз, таблица транспозиций сохраняется между заданиями
+_worker_engine = None
+# Номер перебора корня, к которому относилось последнее задание исполнителя
+_worker_search_id = None
+
+
+def _search_root_move(data, move, depth, time_left, search_id):
+    """
+    Задание для процесса-исполнителя: оценка одного хода корня на заданную глубину.
+
+    Args:
+        :param data: (bytes) Позиция в записи Board.to_bytes
+        :param move: (tuple) Ход корня
+        :param depth: (int) Глубина перебора, считая сам ход
+        :param time_left: (float) Время до конца перебора в секундах на момент отправки (None - без ограничения)
+        :param search_id: (int) Номер перебора корня: с новым номером записи таблицы транспозиций стареют,
+                          как при Engine.search
+
+    :return: (tuple) Оценка хода с точки зрения того, кто ходит в корне, и число просмотренных позиций
+    """
+    global _worker_engine, _worker_search_id
+    if _worker_engine is None:
+        profiling.enable_from_environment()
+        _worker_engine = Engine()
+    engine = _worker_engine
+    if search_id != _worker_search_id:
+        _worker_search_id = search_id
+        engine.table.new_search()
+    engine.deadline = time.perf_counter() + time_left if time_left is not None else float('inf')
+    engine.nodes = 0
+    engine.killers = [[None, None] for _ in range(depth + 1)]
+
+    board = Board.from_bytes(data)
+    board.make_move(*move)
+    return -engine.alpha_beta(board, depth - 1, -INFINITY, INFINITY, 1), engine.nodes
+
+
+class ParallelEngine(Engine):
+    """
+    Движок, который на каждой глубине итеративного углубления перебирает ходы корня параллельно
+    в нескольких процессах. Ходы корня перебираются с полным окном (отсечений между ними нет),
+    зато на следующей глубине они сортируются по оценкам предыдущей.
+    """
+    def __init__(self, workers=None, time_limit=0.1, max_depth=32, table_size=1 << 16, book=None, tablebases=None):
+        """
+        Args:
+            :param workers: (int) Количество процессов (по умолчанию - число ядер)
+            :param time_limit: (float) Время на ход в секундах (None - без ограничения)
+            :param max_depth: (int) Наибольшая глубина перебора
+            :param table_size: (int) Размер таблицы транспозиций
+            :param book: (object) Дебютная книга (book.OpeningBook) или None
+            :param tablebases: (dict) Таблицы эндшпилей (материал -> tablebase.Tablebase) или None
+        """
+        super().__init__(time_limit, max_depth, table_size, book, tablebases)
+        self.workers = workers or os.cpu_count()
+        self.executor = None
+
+    def search(self, board):
+        """
+        Итеративное углубление с параллельным перебором корня.
+
+        Args:
+            :param board: (object) Текущее состояние доски
+
+        :return: (tuple) Лучший ход, его оценка и глубина последнего законченного перебора
+        """
+        started = time.perf_counter()
+        self.nodes = 0
+        # Номер перебора (поколение своей таблицы) передаётся исполнителям, чтобы старели и их таблицы
+        self.table.new_search()
+        search_id = self.table.generation
+        moves = legal_moves(board)
+        if not moves:
+            return None, 0, 0
+        known = self.known_move(board, moves)
+        if known:
+            return known
+        # concurrent.futures (вместе с logging и multiprocessing) нужен только параллельному перебору,
+        # поэтому загружается здесь, а не при импорте модуля
+        import concurrent.futures
+
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+        data = board.to_bytes()
+        best_move, best_score, depth_done = moves[0], 0, 0
+
+        for depth in range(1, self.max_depth + 1):
+            time_left = None
+            if self.time_limit is not None:
+                time_left = self.time_limit - (time.perf_counter() - started)
+                if time_left <= 0:
+                    break
+            futures = {self.executor.submit(_search_root_move, data, move, depth, time_left, search_id): move
+                       for move in moves}
+            done, not_done = concurrent.futures.wait(futures, timeout=time_left)
+            if not_done or any(future.exception() for future in done):
+                for future in not_done:
+                    future.cancel()
+                break
+
+            scores = {}
+            for future in done:
+                scores[futures[future]], nodes = future.result()
+                self.nodes += nodes
+            moves.sort(key=scores.get, reverse=True)
+            best_move, best_score, depth_done = moves[0], scores[moves[0]], depth
+            if abs(best_score) >= MATE - self.max_depth:
+                break
+        return best_move, best_score, depth_done
+
+    def close(self):
+        """
+        Остановка процессов-исполнителей.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+def scaling_report(board, depth, max_workers):
+    """
+    Замер ускорения параллельного перебора на фиксированную глубину для 1..max_workers процессов.
+    Эффективность - ускорение, делённое на число процессов (1.0 - идеальное масштабирование).
+
+    Args:
+        :param board: (object) Позиция для перебора
+        :param depth: (int) Глубина перебора
+        :param max_workers: (int) Наибольшее число процессов
+
+    :return: (list) Строки (процессы, время в секундах, ускорение, эффективность)
+    """
+    import concurrent.futures
+
+    report = []
+    for workers in range(1, max_workers + 1):
+        engine = ParallelEngine(workers, time_limit=None, max_depth=depth)
+        engine.executor = concurrent.futures.ProcessPoolExecutor(workers)
+        try:
+            # Запуск процессов в замер не входит
+            list(engine.executor.map(time.sleep, [0.1] * workers))
+            started = time.perf_counter()
+            engine.search(board)
+            elapsed = time.perf_counter() - started
+        finally:
+            engine.close()
+        speedup = report[0][1] / elapsed if report else 1.0
+        report.append((workers, elapsed, speedup, speedup / workers))
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Замер ускорения параллельного перебора.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='наибольшее число процессов')
+    parser.add_argument('--depth', type=int, default=3, help='глубина перебора')
+    arguments = parser.parse_args()
+    for workers, elapsed, speedup, efficiency in scaling_report(Board(), arguments.depth, arguments.workers):
+        print(f'{workers:>3} процессов: {elapsed:8.3f} s, ускорение {speedup:5.2f}, эффективность {efficiency:5.2f}')
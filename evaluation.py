@@ -0,0 +1,156 @@
+"""
+Статическая оценка позиции: материал, таблицы фигура-клетка и подвижность.
+
+Материал и таблицы фигура-клетка сведены в SQUARE_SCORES[тип, цвет][клетка] (со знаком: белые "+", чёрные "-"),
+а доска поддерживает их сумму в Board.score при каждой записи в клетку (Board.set_square, через которую идут
+move_piece, place_piece, make_move и unmake_move). Поэтому evaluate не просматривает доску и стоит доли микросекунды.
+Подвижность (число ходов по get_possible_moves) считается дорого и входит только в evaluate_full.
+"""
+from bitboard import positions
+from pieces import Pawn, Rook, Knight, Bishop, Queen, King, Mimic, Pegasus, Ninja
+
+PIECE_TYPES = (Pawn, Rook, Knight, Bishop, Queen, King, Mimic, Pegasus, Ninja)
+
+# Ценность фигур в сотых долях пешки. Пегас в тесных позициях подвижнее ферзя, но бьёт только по линиям коня -
+# между ладьёй и ферзём. Мимик не берёт фигуры, а ниндзя достаёт лишь четверть клеток доски - оба дешевле коня.
+PIECE_VALUES = {Pawn: 100, Knight: 300, Bishop: 320, Rook: 500, Queen: 900, King: 0,
+                Mimic: 200, Pegasus: 650, Ninja: 250}
+# Оценка за каждый возможный ход фигуры (только в evaluate_full)
+MOBILITY_WEIGHT = 4
+
+# Таблицы фигура-клетка для белых: строка 0 - восьмая горизонталь (сторона чёрных), строка 7 - первая.
+# Для чёрных таблица отражается по вертикали.
+CENTER = (
+    (-20, -10, -10, -10, -10, -10, -10, -20),
+    (-10,   0,   0,   0,   0,   0,   0, -10),
+    (-10,   0,   5,  10,  10,   5,   0, -10),
+    (-10,   5,  10,  15,  15,  10,   5, -10),
+    (-10,   5,  10,  15,  15,  10,   5, -10),
+    (-10,   0,   5,  10,  10,   5,   0, -10),
+    (-10,   0,   0,   0,   0,   0,   0, -10),
+    (-20, -10, -10, -10, -10, -10, -10, -20),
+)
+PIECE_SQUARE_TABLES = {
+    Pawn: (
+        (  0,   0,   0,   0,   0,   0,   0,   0),
+        ( 50,  50,  50,  50,  50,  50,  50,  50),
+        ( 10,  10,  20,  30,  30,  20,  10,  10),
+        (  5,   5,  10,  25,  25,  10,   5,   5),
+        (  0,   0,   0,  20,  20,   0,   0,   0),
+        (  5,  -5, -10,   0,   0, -10,  -5,   5),
+        (  5,  10,  10, -20, -20,  10,  10,   5),
+        (  0,   0,   0,   0,   0,   0,   0,   0),
+    ),
+    Knight: (
+        (-50, -40, -30, -30, -30, -30, -40, -50),
+        (-40, -20,   0,   0,   0,   0, -20, -40),
+        (-30,   0,  10,  15,  15,  10,   0, -30),
+        (-30,   5,  15,  20,  20,  15,   5, -30),
+        (-30,   0,  15,  20,  20,  15,   0, -30),
+        (-30,   5,  10,  15,  15,  10,   5, -30),
+        (-40, -20,   0,   5,   5,   0, -20, -40),
+        (-50, -40, -30, -30, -30, -30, -40, -50),
+    ),
+    Bishop: CENTER,
+    Rook: (
+        (  0,   0,   0,   0,   0,   0,   0,   0),
+        (  5,  10,  10,  10,  10,  10,  10,   5),
+        ( -5,   0,   0,   0,   0,   0,   0,  -5),
+        ( -5,   0,   0,   0,   0,   0,   0,  -5),
+        ( -5,   0,   0,   0,   0,   0,   0,  -5),
+        ( -5,   0,   0,   0,   0,   0,   0,  -5),
+        ( -5,   0,   0,   0,   0,   0,   0,  -5),
+        (  0,   0,   0,   5,   5,   0,   0,   0),
+    ),
+    Queen: CENTER,
+    King: (
+        (-30, -40, -40, -50, -50, -40, -40, -30),
+        (-30, -40, -40, -50, -50, -40, -40, -30),
+        (-30, -40, -40, -50, -50, -40, -40, -30),
+        (-30, -40, -40, -50, -50, -40, -40, -30),
+        (-20, -30, -30, -40, -40, -30, -30, -20),
+        (-10, -20, -20, -20, -20, -20, -20, -10),
+        ( 20,  20,   0,   0,   0,   0,  20,  20),
+        ( 20,  30,  10,   0,   0,  10,  30,  20),
+    ),
+    # Мимику важно стоять в гуще фигур, а пегасу и ниндзя - держать центр
+    Mimic: CENTER,
+    Pegasus: CENTER,
+    Ninja: CENTER,
+}
+
+
+def _square_scores(piece_type, color):
+    """
+    Материал и таблица фигура-клетка фигуры по клеткам со знаком цвета.
+
+    Args:
+        :param piece_type: (type) Тип фигуры
+        :param color: (str) Цвет фигуры
+
+    :return: (tuple) Оценка фигуры на каждой из 64 клеток
+    """
+    table = PIECE_SQUARE_TABLES[piece_type]
+    if color == 'white':
+        return tuple(PIECE_VALUES[piece_type] + table[square >> 3][square & 7] for square in range(64))
+    return tuple(-PIECE_VALUES[piece_type] - table[7 - (square >> 3)][square & 7] for square in range(64))
+
+
+# SQUARE_SCORES[тип, цвет][клетка] - материал и таблица фигура-клетка со знаком цвета
+SQUARE_SCORES = {(piece_type, color): _square_scores(piece_type, color)
+                 for piece_type in PIECE_TYPES for color in ('white', 'black')}
+
+
+def scan(board):
+    """
+    Полный подсчёт материала и таблиц фигура-клетка по сетке (для update_bitboards и проверки Board.score).
+
+    Args:
+        :param board: (object) Текущее состояние доски
+
+    :return: (int) Оценка с точки зрения белых
+    """
+    score = 0
+    for index0, row in enumerate(board.board):
+        for index1, piece in enumerate(row):
+            if piece:
+                score += SQUARE_SCORES[type(piece), piece.color][index0 * 8 + index1]
+    return score
+
+
+def evaluate(board):
+    """
+    Оценка позиции по материалу и таблицам фигура-клетка с точки зрения того, кто ходит.
+
+    Args:
+        :param board: (object) Текущее состояние доски
+
+    :return: (int) Оценка в сотых долях пешки
+    """
+    return board.score if board.state.turn == 'white' else -board.score
+
+
+def mobility(board, color):
+    """
+    Подвижность: число псевдолегальных ходов фигур данного цвета (по get_possible_moves, через кэш доски).
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param color: (str) Цвет фигур
+
+    :return: (int) Число ходов
+    """
+    return sum(len(board.possible_moves(position)) for position in positions(board.colors[color]))
+
+
+def evaluate_full(board):
+    """
+    Оценка позиции вместе с подвижностью с точки зрения того, кто ходит.
+
+    Args:
+        :param board: (object) Текущее состояние доски
+
+    :return: (int) Оценка в сотых долях пешки
+    """
+    score = board.score + MOBILITY_WEIGHT * (mobility(board, 'white') - mobility(board, 'black'))
+    return score if board.state.turn == 'white' else -score
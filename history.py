@@ -0,0 +1,196 @@
+"""
+История ходов партии в массивах: 32 бита на ход и 64-битный хэш позиции после каждого хода.
+Добавление и отмена хода - O(1), число повторений позиции хранится в словаре по хэшу,
+поэтому проверка троекратного повторения не просматривает историю.
+
+Двоичная запись партии (MoveHistory.to_bytes): заголовок (MAGIC, число ходов, хэш начальной позиции),
+затем коды ходов по 4 байта и хэши по 8 байт (little-endian).
+"""
+import struct
+from array import array
+
+from board import Board, PIECE_CODES, PIECE_TYPES, encode_move, decode_move
+
+HEADER = struct.Struct('<4sIQ')
+MAGIC = b'MHS1'
+EN_PASSANT = 1 << 20
+BLACK = 1 << 21
+
+
+def encode_record(move, captured, color, en_passant=False):
+    """
+    Код хода в истории: ход (15 бит, board.encode_move), взятая фигура (5 бит, номер из PIECE_CODES),
+    взятие на проходе и цвет (по биту).
+
+    Args:
+        :param move: (tuple) Ход в формате (начало, конец, превращение)
+        :param captured: (object) Взятая фигура или None
+        :param color: (str) Цвет, который сделал ход
+        :param en_passant: (bool) Было ли это взятие на проходе
+
+    :return: (int) Код хода
+    """
+    code = encode_move(move)
+    if captured:
+        code |= PIECE_CODES[type(captured), captured.color] << 15
+    if en_passant:
+        code |= EN_PASSANT
+    if color == 'black':
+        code |= BLACK
+    return code
+
+
+def decode_record(code):
+    """
+    Ход по коду из encode_record.
+
+    :param code: (int) Код хода
+    :return: (tuple) Ход в формате (начало, конец, превращение), взятая фигура или None,
+             цвет, который сделал ход, и было ли это взятие на проходе
+    """
+    piece = PIECE_TYPES[code >> 15 & 31]
+    return (decode_move(code), piece[0](piece[1]) if piece else None, 'black' if code & BLACK else 'white',
+            bool(code & EN_PASSANT))
+
+
+class MoveHistory:
+    """
+    История ходов одной партии.
+    """
+    def __init__(self, start_hash=0):
+        """
+        Args:
+            :param start_hash: (int) Хэш начальной позиции (она тоже учитывается в повторениях)
+        """
+        self.start_hash = start_hash
+        self.codes = array('I')
+        self.hashes = array('Q')
+        self.counts = {start_hash: 1}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __bool__(self):
+        return bool(self.codes)
+
+    def __getitem__(self, index):
+        """
+        Запись хода в том виде, в каком её выдаёт pop.
+
+        :param index: (int) Номер хода (с нуля, можно отрицательный)
+        :return: (tuple) Запись хода
+        """
+        index = range(len(self.codes))[index]
+        return self.record(index)
+
+    def __iter__(self):
+        return (self.record(index) for index in range(len(self.codes)))
+
+    def record(self, index):
+        """
+        Запись хода: (номер хода, начало 'e2', конец 'e4', цвет, взятая фигура или None, 'en_passant' или '').
+
+        :param index: (int) Номер хода с нуля
+        :return: (tuple) Запись хода
+        """
+        (start, end, promotion), captured, color, en_passant = decode_record(self.codes[index])
+        return (index + 1, Board.indices_to_position(start), Board.indices_to_position(end),
+                color, captured, 'en_passant' if en_passant else '')
+
+    def append(self, move, captured, color, key, en_passant=False):
+        """
+        Добавление сделанного хода.
+
+        Args:
+            :param move: (tuple) Ход в формате (начало, конец, превращение)
+            :param captured: (object) Взятая фигура или None
+            :param color: (str) Цвет, который сделал ход
+            :param key: (int) Хэш позиции после хода
+            :param en_passant: (bool) Было ли это взятие на проходе
+        """
+        self.codes.append(encode_record(move, captured, color, en_passant))
+        self.hashes.append(key)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def pop(self):
+        """
+        Удаление последнего хода (при отмене).
+
+        :return: (tuple) Запись удалённого хода (как у record)
+        """
+        record = self.record(len(self.codes) - 1)
+        self.codes.pop()
+        key = self.hashes.pop()
+        self.counts[key] -= 1
+        if not self.counts[key]:
+            del self.counts[key]
+        return record
+
+    def moves(self):
+        """
+        Ходы партии для Board.make_move (например, чтобы проиграть загруженную партию).
+
+        :return: (generator) Ходы в формате (начало, конец, превращение)
+        """
+        return (decode_move(code) for code in self.codes)
+
+    @property
+    def current_hash(self):
+        """
+        Хэш текущей позиции (после последнего хода).
+        """
+        return self.hashes[-1] if self.hashes else self.start_hash
+
+    def repetitions(self, key=None):
+        """
+        Сколько раз позиция встречалась в партии.
+
+        :param key: (int) Хэш позиции (по умолчанию - текущая)
+        :return: (int) Число повторений
+        """
+        return self.counts.get(self.current_hash if key is None else key, 0)
+
+    def is_threefold(self):
+        """
+        Троекратное повторение текущей позиции.
+
+        :return: (bool) истина, если позиция встретилась не меньше трёх раз
+        """
+        return self.repetitions() >= 3
+
+    def to_bytes(self):
+        """
+        Двоичная запись партии.
+
+        :return: (bytes) Запись
+        """
+        codes, hashes = array('I', self.codes), array('Q', self.hashes)
+        if struct.pack('=I', 1) != struct.pack('<I', 1):
+            codes.byteswap()
+            hashes.byteswap()
+        return HEADER.pack(MAGIC, len(codes), self.start_hash) + codes.tobytes() + hashes.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        История по записи из MoveHistory.to_bytes.
+
+        Args:
+            :param data: (bytes) Запись
+
+        :return: (object) История
+        """
+        if len(data) < HEADER.size:
+            raise ValueError(f'Запись партии короче заголовка: {len(data)} байт из {HEADER.size}')
+        magic, count, start_hash = HEADER.unpack_from(data)
+        if magic != MAGIC or len(data) != HEADER.size + count * 12:
+            raise ValueError('Некорректная запись партии')
+        history = cls(start_hash)
+        history.codes.frombytes(data[HEADER.size:HEADER.size + count * 4])
+        history.hashes.frombytes(data[HEADER.size + count * 4:])
+        if struct.pack('=I', 1) != struct.pack('<I', 1):
+            history.codes.byteswap()
+            history.hashes.byteswap()
+        for key in history.hashes:
+            history.counts[key] = history.counts.get(key, 0) + 1
+        return history
@@ -1,20 +1,61 @@
 from board import Board
-from pieces import Piece, Pawn, Mimic
+from history import MoveHistory
+from pieces import Pawn, PROMOTIONS
+import profiling
+from render import Renderer
+
+
+class MoveError(Exception):
+    """
+    Ход нельзя сделать, в сообщении - причина для игрока.
+    """
+
 
 class Game:
     """
     Класс игры, где хранится информация об игре.
+    Логика партии (select, play, undo, computer_move, status) не читает ввод и не печатает,
+    терминальная игра (start) построена поверх неё.
     """
-    def __init__(self):
+    def __init__(self, ai_color=None, time_limit=0.1, engine=None, renderer=None):
+        """
+        Args:
+            :param ai_color: (str) Цвет, за который играет компьютер, или None для игры двух людей
+            :param time_limit: (float) Время компьютера на ход в секундах
+            :param engine: (object) Движок для ходов компьютера (по умолчанию создаётся свой)
+            :param renderer: (object) Вывод доски в терминал (по умолчанию - полные кадры в стандартный вывод)
+        """
+        # Замеры времени включаются переменной окружения CHESS_PROFILE (см. profiling.py)
+        profiling.enable_from_environment()
         self.board = Board()
-        self.current_turn = 'white'
-        self.move_count = 0
-        self.move_history = []
+        self.move_history = MoveHistory(self.board.hash)
         self.captured_piece = ''
+        self.ai_color = ai_color
+        if engine is None and ai_color:
+            # Движок загружается, только если играет компьютер: партии двух людей он не нужен
+            from engine import Engine
+            engine = Engine(time_limit)
+        self.engine = engine
+        self.renderer = renderer or Renderer()
+
+    @property
+    def current_turn(self):
+        """
+        Цвет, который сейчас ходит (хранится в состоянии доски).
+        """
+        return self.board.state.turn
+
+    @property
+    def move_count(self):
+        """
+        Количество сделанных ходов (хранится в состоянии доски).
+        """
+        return self.board.state.move_count
 
     def hints(self, start, color):
         """
         Метод для подсказки куда можно сходить и какие фигуры можно съесть.
+        Клетки, где фигуру после хода смогут взять, подсвечиваются отдельно.
 
         Args:
             start (tuple): координаты, откуда ходят
@@ -22,132 +63,224 @@ class Game:
         """
 
         if self.board.get_piece(start):
-            current_piece = self.board.get_piece(start)
-            current_piece_moves = current_piece.get_possible_moves(self.board, start)
-
-            if type(current_piece) == Pawn:
-                for index, move in enumerate(current_piece_moves):
-                    if move[1] == 'en':
-                        current_piece_moves[index] = move[0]
-
-            print('\n   A B C D E F G H')
-            print(' +—————————————————+')
-            for index0, row in enumerate(self.board.board):
-                print(f'{8 - index0}|', end=' ')
-                for index1, piece in enumerate(row):
-                    if (index0, index1) in current_piece_moves:
-                        print(f"\x1B[1;41m{piece if piece else '.'}\x1B[0m", end=' ')
-                    elif (index0, index1) in Piece.under_attack(self.board, color):
-                        print(f'\033[1;43m{piece if piece else '.'}\033[0m', end=' ')
-                    else:
-                        print(piece if piece else '.', end=' ')
-                print(f'|{8 - index0}')
-            print(' +—————————————————+')
-            print('   A B C D E F G H')
+            targets, risky = self.safe_moves(start)
+            self.renderer.draw(self.board, targets, self.board.attack_map(color), blank_line=True, risky=risky)
 
-    def start(self):
+    def safe_moves(self, start):
         """
-        Начало игры, тут записаны проверки на ввод, передача хода другому игроку, цикл игры до ввода exit, возврат ходов.
+        Куда фигура может пойти по правилам и на каких из этих клеток её смогут взять следующим ходом.
+        Ходы пробуются на копии доски, общая доска не меняется.
+
+        Args:
+            :param start: (tuple) Позиция фигуры
+
+        :return: (tuple) Множество клеток для хода и множество клеток из них, где фигура окажется под боем
         """
-        while True:
-            self.board.display(self.current_turn)
-            print(f"Ход {'белых' if self.current_turn == 'white' else 'чёрных'}.")
+        color = self.board.get_piece(start).color
+        trial = self.board.copy()
+        targets, risky = set(), set()
+        for move in self.board.legal_moves():
+            if move[0] != start or move[1] in targets:
+                continue
+            targets.add(move[1])
+            trial.make_move(*move)
+            if move[1] in trial.attack_map(color):
+                risky.add(move[1])
+            trial.unmake_move()
+        return targets, risky
 
-            if self.board.find_king(self.current_turn) in Piece.under_attack(self.board, self.current_turn):
-                print('Вам шах! Обезопасьте короля!')
+    def status(self):
+        """
+        Состояние партии для того, кто ходит.
 
-            start = input('Введите координаты целевой фигуры: ').strip()
-            if not start: continue
-            if start == 'exit':
-                print('Игра окончена!')
-                break
+        :return: (str) 'checkmate', 'stalemate', 'repetition' (троекратное повторение), 'check' или None,
+                 если ничего особенного
+        """
+        in_check = self.board.find_king(self.current_turn) in self.board.attack_map(self.current_turn)
+        if not self.board.legal_moves():
+            return 'checkmate' if in_check else 'stalemate'
+        if self.move_history.is_threefold():
+            return 'repetition'
+        return 'check' if in_check else None
 
-            if start == 'undo':
-                if not self.move_history:
-                    print("Нет ходов для отмены.")
-                    continue
-                move_count, start, end, current_turn, captured_piece, en_passant = self.move_history.pop()
-                print(f"Ход {'белых' if current_turn == 'white' else 'чёрных'}.")
-                index_start = self.board.position_to_indices(start)
-                index_end = self.board.position_to_indices(end)
-                self.board.move_piece(index_end, index_start)
-
-                if en_passant:
-                    if current_turn == 'white':
-                        self.board.place_piece((index_end[0] + 1, index_end[1]), captured_piece)
-                    else: self.board.place_piece((index_end[0] - 1, index_end[1]), captured_piece)
-                else: self.board.place_piece(index_end, captured_piece)
-
-                self.move_count -= 1
-                self.current_turn = 'black' if self.current_turn == 'white' else 'white'
-                try:
-                    Piece.last_move = (self.board.position_to_indices(self.move_history[-1][1]),
-                                       self.board.position_to_indices(self.move_history[-1][2]))
-                except IndexError:
-                    Piece.last_move = []
-                continue
+    def select(self, start):
+        """
+        Проверка выбранной для хода фигуры.
 
+        Args:
+            :param start: (str) Позиция фигуры в формате 'e2'
 
-            if len(start) != 2 or start[0] not in 'abcdefgh' or start[1] not in '12345678':
-                print("Некорректный ввод. Введите координаты в формате 'e2'.\n")
-                continue
+        :return: (tuple) Индексы позиции и фигура
+        """
+        if len(start) != 2 or start[0] not in 'abcdefgh' or start[1] not in '12345678':
+            raise MoveError("Некорректный ввод. Введите координаты в формате 'e2'.")
+        index_start = self.board.position_to_indices(start)
+        piece = self.board.get_piece(index_start)
+        if not piece:
+            raise MoveError('На этой позиции нет фигуры.')
+        if piece.color != self.current_turn:
+            raise MoveError('Вы не можете ходить чужой фигурой.')
+        return index_start, piece
 
-            index_start = self.board.position_to_indices(start)
+    def play(self, start, end, promotion=None):
+        """
+        Ход игрока с проверкой по правилам и записью в историю.
 
-            piece = self.board.get_piece(index_start)
-            if not piece:
-                print('На этой позиции нет фигуры.')
-                continue
+        Args:
+            :param start: (str) Позиция фигуры в формате 'e2'
+            :param end: (str) Целевая позиция в формате 'e4'
+            :param promotion: (str) Символ фигуры для превращения пешки ('R', 'B', 'Q', 'N'),
+                              обязателен, если пешка доходит до края поля
 
-            print('Выбранная фигура:', piece)
+        :return: (object) Взятая фигура или None
+        """
+        index_start, piece = self.select(start)
+        if len(end) != 2 or end[0] not in 'abcdefgh' or end[1] not in '12345678':
+            raise MoveError("Некорректный ввод. Введите координаты в формате 'e4'.")
+        index_end = self.board.position_to_indices(end)
 
-            if piece.color != self.current_turn:
-                print('Вы не можете ходить чужой фигурой.')
-                continue
+        possible_moves = self.board.possible_moves(index_start)
+        if index_end not in possible_moves and (index_end, 'en') not in possible_moves:
+            raise MoveError('Недопустимый ход.')
+        if not any(move[0] == index_start and move[1] == index_end for move in self.board.legal_moves()):
+            raise MoveError('Так ходить нельзя: король останется под боем.')
+
+        if type(piece) == Pawn and (index_end[0] == 0 or index_end[0] == 7):
+            promotion = promotion.upper() if promotion else None
+            if promotion not in PROMOTIONS:
+                raise MoveError('Выберите фигуру для замены пешки: R, B, Q или N.')
+        else:
+            promotion = None
+
+        special_move = ''
+        if type(piece) == Pawn and (index_end, 'en') in possible_moves:
+            special_move = 'en_passant'
+
+        color = self.current_turn
+        self.captured_piece = self.board.make_move(index_start, index_end, promotion)
+        self.move_history.append((index_start, index_end, promotion), self.captured_piece, color, self.board.hash,
+                                 bool(special_move))
+        return self.captured_piece
+
+    def undo(self):
+        """
+        Отмена последнего хода (против компьютера - вместе с его ответом).
+
+        :return: (list) Отменённые записи истории ходов (как у MoveHistory.record), последняя - первой
+        """
+        if not self.move_history:
+            raise MoveError('Нет ходов для отмены.')
+        undone = [self.move_history.pop()]
+        self.board.unmake_move()
+        # Против компьютера отменяем и его ответ, чтобы снова был ход человека
+        if self.move_history and self.current_turn == self.ai_color:
+            undone.append(self.move_history.pop())
+            self.board.unmake_move()
+        return undone
+
+    def computer_move(self):
+        """
+        Ход компьютера: поиск лучшего хода движком и запись его в историю.
+
+        :return: (tuple) Позиции начала и конца хода в формате 'e2' и фигура для превращения пешки (или None)
+        """
+        start, end, promotion = self.engine.best_move(self.board)
+        piece = self.board.board[start[0]][start[1]]
+        special_move = ''
+        if type(piece) == Pawn and start[1] != end[1] and not self.board.board[end[0]][end[1]]:
+            special_move = 'en_passant'
+
+        color = self.current_turn
+        self.captured_piece = self.board.make_move(start, end, promotion)
+        self.move_history.append((start, end, promotion), self.captured_piece, color, self.board.hash,
+                                 bool(special_move))
+        start, end = self.board.indices_to_position(start), self.board.indices_to_position(end)
+        return start, end, promotion
 
-            self.hints(index_start, self.current_turn)
+    def start(self):
+        """
+        Игра в терминале: ввод ходов, передача хода другому игроку, цикл игры до ввода exit, возврат ходов.
+        """
+        print()
+        while True:
+            self.board.display(self.current_turn, self.renderer)
             print(f"Ход {'белых' if self.current_turn == 'white' else 'чёрных'}.")
 
-            end = input('Введите целевые координаты хода: ').strip()
-            if not end:
+            status = self.status()
+            if status == 'checkmate':
+                print(f"Мат! Победили {'чёрные' if self.current_turn == 'white' else 'белые'}.")
+            elif status == 'stalemate':
+                print('Пат! Ничья.')
+            elif status == 'repetition':
+                print('Троекратное повторение позиции! Ничья.')
+            elif status == 'check':
+                print('Вам шах! Обезопасьте короля!')
+            if status in ('checkmate', 'stalemate', 'repetition'):
+                print("Можно отменить ход (undo) или выйти (exit).")
+            elif self.current_turn == self.ai_color:
+                start, end, promotion = self.computer_move()
+                print(f'Компьютер ходит {start} {end}' + (f' с превращением в {promotion}' if promotion else '') + '.')
                 continue
 
-            if len(end) != 2 or end[0] not in 'abcdefgh' or end[1] not in '12345678':  # Проверка на корректный ввод
-                print("Некорректный ввод. Введите координаты в формате 'e4'.\n")
-                continue
+            start = input('Введите координаты целевой фигуры: ').strip()
+            if not start: continue
+            if start == 'exit':
+                print('Игра окончена!')
+                break
+
+            try:
+                if start == 'undo':
+                    current_turn = self.undo()[0][3]
+                    print(f"Ход {'белых' if current_turn == 'white' else 'чёрных'}.")
+                    continue
 
-            index_end = self.board.position_to_indices(end)
+                index_start, piece = self.select(start)
+                print('Выбранная фигура:', piece)
+                self.hints(index_start, self.current_turn)
+                print(f"Ход {'белых' if self.current_turn == 'white' else 'чёрных'}.")
 
-            if index_end in piece.get_possible_moves(self.board, index_start) or \
-               (index_end, 'en') in piece.get_possible_moves(self.board, index_start):
-                special_move = ''
+                end = input('Введите целевые координаты хода: ').strip()
+                if not end:
+                    continue
+
+                promotion = None
+                index_end = self.board.position_to_indices(end) if len(end) == 2 and end[1].isdigit() else None
+                if type(piece) == Pawn and index_end and (index_end[0] == 0 or index_end[0] == 7):
+                    promotion = piece.choose_promotion()
+                self.play(start, end, promotion)
+            except MoveError as error:
+                print(error)
 
-                if (index_end, 'en') in piece.get_possible_moves(self.board, index_start):
-                    special_move = 'en_passant'
-                    if self.current_turn == 'white':
-                        self.captured_piece = self.board.get_piece((index_end[0] + 1, index_end[1]))
-                    else: self.captured_piece = self.board.get_piece((index_end[0] - 1, index_end[1]))
-                else: self.captured_piece = self.board.get_piece(index_end)
 
-                if type(piece) == Mimic:
-                    self.board.board[index_start[0]][index_start[1]] = self.board.get_piece(index_end)
-                    self.board.board[index_end[0]][index_end[1]] = piece
-                else:
-                    self.board.move_piece(index_start, index_end)
 
-                if type(piece) == Pawn and (index_end[0] == 0 or index_end[0] == 7):
-                    self.board.display(self.current_turn)
-                    piece.transform(self.board, index_end)
+def main(argv=None):
+    """
+    Точка входа терминальной игры. Импорт модуля игру не запускает, поэтому Game можно использовать
+    из сервера и других процессов.
 
-                self.move_count += 1
-                self.move_history.append([self.move_count, start, end, self.current_turn, self.captured_piece, special_move])
-                Piece.last_move = (index_start, index_end)
-                self.current_turn = 'black' if self.current_turn == 'white' else 'white'
+    Args:
+        :param argv: (list) Аргументы командной строки (по умолчанию - sys.argv[1:])
+    """
+    import argparse
 
-            else:
-                print('Недопустимый ход.')
+    parser = argparse.ArgumentParser(description='Шахматы с мимиком, пегасом и ниндзя.')
+    parser.add_argument('ai_color', nargs='?', choices=('white', 'black'), help='цвет, за который играет компьютер')
+    parser.add_argument('--incremental', action='store_true',
+                        help='перерисовывать только изменившиеся клетки (для медленных терминалов)')
+    parser.add_argument('--book', help='файл дебютной книги (python book.py)')
+    parser.add_argument('--tablebases', help='каталог таблиц эндшпилей (python tablebase.py)')
+    arguments = parser.parse_args(argv)
+    engine = None
+    if arguments.ai_color and (arguments.book or arguments.tablebases):
+        from book import OpeningBook
+        from engine import Engine
+        from tablebase import open_tablebases
 
+        engine = Engine(book=OpeningBook.open(arguments.book) if arguments.book else None,
+                        tablebases=open_tablebases(arguments.tablebases) if arguments.tablebases else None)
+    game = Game(arguments.ai_color, engine=engine, renderer=Renderer(incremental=arguments.incremental))
+    game.start()
 
 
-game = Game()
-game.start()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Кэш результатов генерации ходов с вытеснением давно не использованных записей (LRU).
+Ключ начинается с хэша позиции по Зобристу, поэтому любое изменение доски (ход, отмена, запись в клетку)
+даёт новый ключ, и старые результаты для изменённой позиции уже не находятся.
+"""
+from collections import OrderedDict
+
+
+class MoveCache:
+    """
+    Ограниченный по размеру кэш со статистикой попаданий.
+    """
+    def __init__(self, size=256):
+        """
+        Args:
+            :param size: (int) Наибольшее число записей (0 - кэш выключен)
+        """
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key, compute):
+        """
+        Результат из кэша или посчитанный заново (и сохранённый).
+
+        Args:
+            :param key: (tuple) Ключ: хэш позиции и то, что для неё считается (клетка, цвет...)
+            :param compute: (function) Функция без аргументов, которая считает результат
+
+        :return: (object) Результат
+        """
+        entries = self.entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+
+        self.misses += 1
+        value = compute()
+        if self.size:
+            entries[key] = value
+            if len(entries) > self.size:
+                entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        """
+        Удаление всех записей (статистика сохраняется).
+        """
+        self.entries.clear()
+
+    def stats(self):
+        """
+        Статистика кэша.
+
+        :return: (dict) Размер, число записей, попаданий, промахов и доля попаданий
+        """
+        total = self.hits + self.misses
+        return {'size': self.size, 'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0}
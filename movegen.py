@@ -0,0 +1,352 @@
+"""
+Генерация ходов для всей позиции: псевдолегальные ходы (как их проверяет Game.start) и легальные ходы,
+после которых свой король не остаётся под боем, а также определение шаха, мата и пата.
+
+Легальные ходы фильтруются масками связок и шаха, ходы короля проверяются по атакам на клетку без короля,
+а делать ход и проверять короля приходится только для ходов мимика, взятия на проходе и ходов,
+которые меняют соседей мимика соперника так, что он перенимает другие ходы.
+"""
+from bitboard import (RAYS, RAY_DIRECTIONS, FORWARD, LINES, MIMIC_REACH, KING_ATTACKS, KNIGHT_ATTACKS,
+                      NINJA_ATTACKS, PAWN_CAPTURES, ROOK_DIRECTIONS, BISHOP_DIRECTIONS, PEGASUS_DIRECTIONS,
+                      positions, slider_attacks)
+from pieces import Pawn, Rook, Knight, Bishop, Queen, King, Mimic, Pegasus, Ninja, PROMOTIONS
+
+OTHER_COLOR = {'white': 'black', 'black': 'white'}
+# Дальнобойные фигуры (кроме ферзя и мимика) по группам направлений
+SLIDERS = {ROOK_DIRECTIONS: (Rook,), BISHOP_DIRECTIONS: (Bishop,), PEGASUS_DIRECTIONS: (Pegasus,)}
+# Виды ходов, которые мимик перенимает у соседа (как в Mimic.copied_moves): ферзь даёт ходы ладьи и слона,
+# ходы пешки зависят от её цвета, у мимика и ниндзя ничего не перенимается
+COPIED_KINDS = {(piece_type, color): kinds
+                for color in OTHER_COLOR
+                for piece_type, kinds in ((Pawn, ((Pawn, color),)), (Rook, (Rook,)), (Knight, (Knight,)),
+                                          (Bishop, (Bishop,)), (Queen, (Rook, Bishop)), (King, (King,)),
+                                          (Mimic, ()), (Pegasus, (Pegasus,)), (Ninja, ()))}
+
+
+def generate_moves(board, color):
+    """
+    Все псевдолегальные ходы данного цвета в том виде, в каком их принимает Board.make_move.
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param color: (str) Цвет, который ходит
+
+    :return: (list) Ходы в формате (начало, конец, фигура для превращения пешки или None)
+    """
+    moves = []
+    for start in positions(board.colors[color]):
+        piece = board.board[start[0]][start[1]]
+        ends = [move[0] if type(move[1]) == str else move for move in piece.get_possible_moves(board, start)]
+        if type(piece) == Mimic:
+            ends = list(dict.fromkeys(ends))
+        for end in ends:
+            if type(piece) == Pawn and (end[0] == 0 or end[0] == 7):
+                moves += [(start, end, promotion) for promotion in PROMOTIONS]
+            else:
+                moves.append((start, end, None))
+    return moves
+
+
+def mimic_attacks(board, square):
+    """
+    Клетки, которые бьёт мимик, по типам соседних фигур (ходы пешки вперёд не бьют и не учитываются).
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param square: (int) Номер клетки мимика
+
+    :return: (tuple) Направления, по которым мимик ходит как дальнобойная фигура, и битборд атак прыжками
+    """
+    directions, leaps, pawns = Mimic.copied_moves(board, square)
+    for pawn in pawns:
+        leaps |= PAWN_CAPTURES[pawn.direction][square]
+    return directions, leaps
+
+
+def attackers(board, square, color, occupied=None):
+    """
+    Фигуры данного цвета, которые могут пойти на занятую клетку (то есть взять стоящую там фигуру).
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param square: (int) Номер клетки
+        :param color: (str) Цвет атакующих фигур
+        :param occupied: (int) Битборд занятых клеток для лучей дальнобойных фигур (по умолчанию - board.occupied)
+
+    :return: (tuple) Битборд всех атакующих и битборд тех, кто бьёт издалека (от них можно закрыться)
+    """
+    bitboards = board.bitboards
+    if occupied is None:
+        occupied = board.occupied
+    # Пешки бьют по диагонали вперёд, значит на клетку нападают пешки, стоящие по диагонали "сзади" неё
+    leapers = ((KNIGHT_ATTACKS[square] & bitboards[Knight, color]) |
+               (KING_ATTACKS[square] & bitboards[King, color]) |
+               (NINJA_ATTACKS[square] & bitboards[Ninja, color]) |
+               (PAWN_CAPTURES[1 if color == 'white' else -1][square] & bitboards[Pawn, color]))
+    # Лучи строим только для тех групп, где на пустой доске вообще есть кому достать до клетки
+    queens = bitboards[Queen, color]
+    sliders = 0
+    for group, group_pieces in ((ROOK_DIRECTIONS, bitboards[Rook, color] | queens),
+                                (BISHOP_DIRECTIONS, bitboards[Bishop, color] | queens),
+                                (PEGASUS_DIRECTIONS, bitboards[Pegasus, color])):
+        if LINES[group][square] & group_pieces:
+            sliders |= slider_attacks(square, occupied, group) & group_pieces
+
+    target = 1 << square
+    mimics = bitboards[Mimic, color] & MIMIC_REACH[square]
+    while mimics:
+        mimic = mimics & -mimics
+        mimics ^= mimic
+        mimic_square = mimic.bit_length() - 1
+        directions, leaps = mimic_attacks(board, mimic_square)
+        if leaps & target:
+            leapers |= mimic
+        elif directions and slider_attacks(mimic_square, occupied, directions) & target:
+            sliders |= mimic
+    return leapers | sliders, sliders
+
+
+def in_check(board, color):
+    """
+    Проверка, находится ли король данного цвета под боем.
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param color: (str) Цвет короля
+
+    :return: (bool) истина, если король под боем (если короля нет - ложь)
+    """
+    king = board.bitboards[King, color]
+    return bool(king and attackers(board, king.bit_length() - 1, OTHER_COLOR[color])[0])
+
+
+def slides_along(board, square, color, directions):
+    """
+    Может ли фигура данного цвета на клетке бить вдоль одного из направлений.
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param square: (int) Номер клетки фигуры
+        :param color: (str) Цвет фигуры
+        :param directions: (tuple) Группа направлений (ладьи, слона или пегаса)
+
+    :return: (bool) истина, если фигура ходит вдоль этих направлений
+    """
+    piece = board.board[square >> 3][square & 7]
+    if piece.color != color:
+        return False
+    piece_type = type(piece)
+    if piece_type == Mimic:
+        return directions[0] in mimic_attacks(board, square)[0]
+    if piece_type == Queen:
+        return directions is not PEGASUS_DIRECTIONS
+    return piece_type in SLIDERS[directions]
+
+
+def nearest(blockers, forward):
+    """
+    Ближайшая к началу луча фигура.
+
+    Args:
+        :param blockers: (int) Битборд фигур на луче
+        :param forward: (bool) Растут ли номера клеток вдоль луча
+
+    :return: (int) Номер клетки ближайшей фигуры
+    """
+    if forward:
+        return (blockers & -blockers).bit_length() - 1
+    return blockers.bit_length() - 1
+
+
+def pins(board, king_square, color):
+    """
+    Связанные фигуры: свои фигуры, которые закрывают короля от дальнобойной фигуры соперника.
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param king_square: (int) Номер клетки короля
+        :param color: (str) Цвет короля
+
+    :return: (dict) Номер клетки связанной фигуры -> битборд клеток, куда она может ходить, не открывая короля
+    """
+    occupied = board.occupied
+    own = board.colors[color]
+    enemy = OTHER_COLOR[color]
+    pinned = {}
+    for group in (ROOK_DIRECTIONS, BISHOP_DIRECTIONS, PEGASUS_DIRECTIONS):
+        for direction in group:
+            rays = RAYS[direction]
+            blockers = rays[king_square] & occupied
+            if not blockers:
+                continue
+            forward = direction in FORWARD
+            first = nearest(blockers, forward)
+            if not own >> first & 1:
+                continue
+            blockers = rays[first] & occupied
+            if not blockers:
+                continue
+            second = nearest(blockers, forward)
+            if slides_along(board, second, enemy, group):
+                pinned[first] = rays[king_square] ^ rays[second]
+    return pinned
+
+
+def copied_kinds(board, square):
+    """
+    Сколько соседей мимика даёт ему каждый вид ходов (COPIED_KINDS).
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param square: (int) Номер клетки мимика
+
+    :return: (dict) Вид ходов -> число соседей с такими ходами
+    """
+    counts = {}
+    for y, x in positions(KING_ATTACKS[square] & board.occupied):
+        piece = board.board[y][x]
+        for kind in COPIED_KINDS[type(piece), piece.color]:
+            counts[kind] = counts.get(kind, 0) + 1
+    return counts
+
+
+def changes_copied_moves(board, move, mimics):
+    """
+    Меняет ли ход набор ходов, которые перенимает хотя бы один из мимиков
+    (появляется вид ходов, которого у соседей не было, или уходит последний сосед с таким видом).
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param move: (tuple) Ход в формате (начало, конец, фигура для превращения пешки или None)
+        :param mimics: (dict) Номер клетки мимика -> виды ходов его соседей (copied_kinds)
+
+    :return: (bool) истина, если хотя бы один мимик будет ходить иначе
+    """
+    start, end, promotion = move
+    from_square = start[0] * 8 + start[1]
+    to_square = end[0] * 8 + end[1]
+    piece = board.board[start[0]][start[1]]
+    captured = board.board[end[0]][end[1]]
+    arrived = COPIED_KINDS[PROMOTIONS[promotion] if promotion else type(piece), piece.color]
+    for mimic_square, counts in mimics.items():
+        near = KING_ATTACKS[mimic_square]
+        # Взятый мимик больше ничего не бьёт
+        if to_square == mimic_square or not (near >> from_square | near >> to_square) & 1:
+            continue
+        changes = {}
+        if near >> from_square & 1:
+            for kind in COPIED_KINDS[type(piece), piece.color]:
+                changes[kind] = changes.get(kind, 0) - 1
+        if near >> to_square & 1:
+            if captured:
+                for kind in COPIED_KINDS[type(captured), captured.color]:
+                    changes[kind] = changes.get(kind, 0) - 1
+            for kind in arrived:
+                changes[kind] = changes.get(kind, 0) + 1
+        for kind, change in changes.items():
+            count = counts.get(kind, 0)
+            if change and (count > 0) != (count + change > 0):
+                return True
+    return False
+
+
+def legal_moves(board, color=None):
+    """
+    Все легальные ходы: псевдолегальные ходы, после которых свой король не под боем.
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param color: (str) Цвет, который ходит (по умолчанию - из состояния доски)
+
+    :return: (list) Ходы в формате (начало, конец, фигура для превращения пешки или None)
+    """
+    color = color or board.state.turn
+    moves = generate_moves(board, color)
+    king = board.bitboards[King, color]
+    if not king:
+        return moves
+
+    enemy = OTHER_COLOR[color]
+    king_square = king.bit_length() - 1
+    checkers, sliding_checkers = attackers(board, king_square, enemy)
+    pinned = pins(board, king_square, color)
+
+    # Куда можно пойти не королём, чтобы закрыться от шаха или взять шахующую фигуру
+    evasions = -1
+    if checkers:
+        if checkers & (checkers - 1):
+            evasions = 0
+        else:
+            evasions = checkers
+            if sliding_checkers:
+                for rays in (RAYS[direction] for direction in RAY_DIRECTIONS):
+                    if rays[king_square] & checkers:
+                        evasions |= rays[king_square] ^ rays[checkers.bit_length() - 1]
+                        break
+
+    # Мимик соперника бьёт по-разному в зависимости от соседей: ходы рядом с ним отбираем по changes_copied_moves
+    mimics = {}
+    unsafe = 0
+    for mimic in positions(board.bitboards[Mimic, enemy]):
+        mimic_square = mimic[0] * 8 + mimic[1]
+        mimics[mimic_square] = copied_kinds(board, mimic_square)
+        unsafe |= KING_ATTACKS[mimic_square]
+    # Без короля на доске, чтобы он не закрывал собой лучи, вдоль которых отходит
+    without_king = board.occupied ^ king
+
+    legal = []
+    for move in moves:
+        start, end, promotion = move
+        from_square = start[0] * 8 + start[1]
+        to_square = end[0] * 8 + end[1]
+        piece = board.board[start[0]][start[1]]
+        piece_type = type(piece)
+        target = board.board[end[0]][end[1]]
+        # Мимик меняется местами с фигурой на клетке конца (в том числе чужой), а взятие на проходе убирает пешку
+        # не с клетки конца хода - такие ходы, как и ходы, меняющие соседей мимика соперника, делаем честно.
+        # На пустую клетку мимик ходит как обычная фигура
+        if ((piece_type == Mimic and target) or (piece_type == Pawn and start[1] != end[1] and not target) or
+                (unsafe >> from_square | unsafe >> to_square) & 1 and changes_copied_moves(board, move, mimics)):
+            board.make_move(start, end, promotion)
+            if not in_check(board, color):
+                legal.append(move)
+            board.unmake_move()
+            continue
+        if piece_type == King:
+            if not attackers(board, to_square, enemy, without_king)[0]:
+                legal.append(move)
+            continue
+        if not evasions >> to_square & 1:
+            continue
+        if from_square in pinned and not pinned[from_square] >> to_square & 1:
+            continue
+        legal.append(move)
+    return legal
+
+
+def is_checkmate(board, color=None):
+    """
+    Мат: король под боем и легальных ходов нет.
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param color: (str) Цвет, для которого проверяем (по умолчанию - тот, кто ходит)
+
+    :return: (bool) истина, если мат
+    """
+    color = color or board.state.turn
+    return in_check(board, color) and not legal_moves(board, color)
+
+
+def is_stalemate(board, color=None):
+    """
+    Пат: король не под боем, но легальных ходов нет.
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param color: (str) Цвет, для которого проверяем (по умолчанию - тот, кто ходит)
+
+    :return: (bool) истина, если пат
+    """
+    color = color or board.state.turn
+    return not in_check(board, color) and not legal_moves(board, color)
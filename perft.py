@@ -0,0 +1,85 @@
+"""
+Perft - подсчёт числа позиций на заданной глубине перебора ходов.
+Нужен для проверки правильности генерации ходов (со всеми фигурами варианта, взятием на проходе
+и превращением пешки) и для замера её скорости.
+
+Запуск: python perft.py [--depth N] [--check]
+"""
+import argparse
+import time
+
+from board import Board, START_FEN
+from movegen import generate_moves
+
+# Сохранённые позиции: (название, запись в формате FEN)
+POSITIONS = [
+    ('start', START_FEN),
+    ('en_passant', 'rnbqkbnr/1ppp1p1j/g2gp3/jmMQ1PpR/5J2/2P3m1/JP1PPG2/RNBMKBN1 w g6 0'),
+    ('promotion', 'rnbqkb1r/jpppP2n/2m2p1B/4M3/3g2mp/G2J3N/JPPg2PM/RN1QKB1R w - 0'),
+    ('mimics', 'r1bqkb1r/j1p2p1j/gmnp1mpg/1p2p3/3P2n1/G1M1PM1N/JPP2PPJ/R1BQKB1R b - 0'),
+]
+
+# Эталонное число позиций для глубин 1, 2, 3 (псевдолегальные ходы, как их проверяет Game.start)
+REFERENCE = {
+    'start': (24, 664, 20508),
+    'en_passant': (84, 4135, 305816),
+    'promotion': (63, 2663, 160750),
+    'mimics': (50, 2107, 109434),
+}
+
+
+def perft(board, depth):
+    """
+    Число позиций, получающихся после depth полуходов из текущей позиции.
+
+    Args:
+        :param board: (object) Текущее состояние доски
+        :param depth: (int) Глубина перебора
+
+    :return: (int) Число позиций
+    """
+    moves = generate_moves(board, board.state.turn)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+
+    nodes = 0
+    for move in moves:
+        board.make_move(*move)
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def run(depth, check):
+    """
+    Запуск perft по всем сохранённым позициям с выводом числа позиций в секунду.
+
+    Args:
+        :param depth: (int) Максимальная глубина
+        :param check: (bool) Сверять ли результат с эталоном
+
+    :return: (bool) истина, если все результаты совпали с эталоном
+    """
+    ok = True
+    for name, fen in POSITIONS:
+        for current_depth in range(1, depth + 1):
+            board = Board.from_fen(fen)
+            started = time.perf_counter()
+            nodes = perft(board, current_depth)
+            elapsed = time.perf_counter() - started
+            line = f'{name:<12} depth {current_depth}: {nodes:>10} nodes {elapsed:8.3f} s {nodes / elapsed:12.0f} nodes/s'
+            if check and current_depth <= len(REFERENCE[name]):
+                expected = REFERENCE[name][current_depth - 1]
+                line += ' ok' if nodes == expected else f' ОШИБКА (ожидалось {expected})'
+                ok = ok and nodes == expected
+            print(line)
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Perft для шахматного варианта с мимиком, пегасом и ниндзя.')
+    parser.add_argument('--depth', type=int, default=3, help='максимальная глубина перебора')
+    parser.add_argument('--check', action='store_true', help='сверить результаты с эталоном')
+    arguments = parser.parse_args()
+    if not run(arguments.depth, arguments.check):
+        raise SystemExit(1)
@@ -1,18 +1,56 @@
+from bitboard import (LEAPS, KING_ATTACKS, KNIGHT_ATTACKS, PAWN_CAPTURES, PAWN_PUSHES, ROOK_DIRECTIONS,
+                      BISHOP_DIRECTIONS, QUEEN_DIRECTIONS, KNIGHT_DIRECTIONS, KING_DIRECTIONS, PEGASUS_DIRECTIONS,
+                      NINJA_DIRECTIONS, positions, slider_attacks)
+
+
 class Piece:
     """
     Родительский класс для всех фигур.
+    Фигуры неизменяемы и общие для всех досок: Rook('white') всегда возвращает один и тот же объект,
+    поэтому доска и её копии хранят только ссылки в сетке.
     """
+    __slots__ = ('color', 'symbol')
 
-    last_move = []
+    start_rows = {'white': 6, 'black': 1}
+    letter = ''  # символ белой фигуры, у чёрной - строчная буква
+    _instances = {}
 
-    def __init__(self, color, symbol):
+    def __new__(cls, color):
         """
         Args:
             :param color: (str) Цвет фигуры
-            :param symbol: (str) Символ, который будет отображаться на доске
+
+        :return: (object) Общий объект фигуры данного типа и цвета
+        """
+        piece = cls._instances.get((cls, color))
+        if piece is None:
+            piece = cls._instances[cls, color] = cls._create(color)
+        return piece
+
+    @classmethod
+    def _create(cls, color):
+        """
+        Создание объекта фигуры (один раз на тип и цвет).
+
+        :param color: (str) Цвет фигуры
+        :return: (object) Фигура
+        """
+        piece = object.__new__(cls)
+        object.__setattr__(piece, 'color', color)
+        object.__setattr__(piece, 'symbol', cls.letter if color == 'white' else cls.letter.lower())
+        return piece
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'Фигура {self.symbol} неизменяема')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'Фигура {self.symbol} неизменяема')
+
+    def __reduce__(self):
+        """
+        При копировании и передаче в другой процесс фигура восстанавливается как общий объект.
         """
-        self.color = color
-        self.symbol = symbol
+        return type(self), (self.color,)
 
     def __str__(self):
         """
@@ -34,60 +72,60 @@ class Piece:
 
         :return: (list) Все возможные ходы без учёта цвета фигур
         """
-        start_y, start_x = start
-        moves = []
+        moves = positions(self.attacks_p(board, start, direction))
+        return self.en_passant(board, start, direction, moves)
 
-        if (board.is_valid_position((start_y + direction, start_x)) and
-            not board.get_piece((start_y + direction, start_x))):
-            moves.append((start_y + direction, start_x))
+    def attacks_p(self, board, start, direction):
+        """
+        Ходы пешки битбордом: на одну или две клетки вперёд и взятия по диагонали (без учёта цвета фигур
+        и без взятия на проходе).
 
-        if (self.color == 'white' and start_y == 6) or (self.color == 'black' and start_y == 1):
-            if not (board.get_piece((start_y + direction * 2, start_x)) or
-                    board.get_piece((start_y + direction, start_x))):
-                moves.append((start_y + direction * 2, start_x))
+        Args:
+            :param board: (object) Текущее состояние доски
+            :param start: (tuple) Позиция данной фигуры
+            :param direction: (tuple) Направление хода, которое есть у фигуры (у пешки оно одно)
 
-        self.en_passant(board, start, direction, self.last_move, moves)
+        :return: (int) Битборд клеток, куда может пойти пешка
+        """
+        square = start[0] * 8 + start[1]
+        occupied = board.occupied
+        moves = PAWN_PUSHES[direction][square] & ~occupied
+        if moves and start[0] == self.start_rows[self.color]:
+            moves |= PAWN_PUSHES[direction][square + direction * 8] & ~occupied
 
         # pawn_kill (Пешка кушает другую фигуру)
-        for pawn_kills in [-1, 1]:
-            kill_pos = (start_y + direction, start_x + pawn_kills)
-            if board.is_valid_position(kill_pos):
-                if board.get_piece(kill_pos):
-                    moves.append(kill_pos)
-        return moves
+        return moves | PAWN_CAPTURES[direction][square] & occupied
 
-    def en_passant(self, board, start, direction, last_move, moves):
+    def en_passant(self, board, start, direction, moves):
         """
         Дополнительный учёт "взятия на проходе" для пешки.
         Так как проверка довольно длинная, это реализовано как отдельный метод.
+        Пешка, которую можно взять на проходе, хранится в состоянии доски (board.state.en_passant).
 
         Args:
             :param board: (object) Текущее состояние доски
             :param start: (tuple) Позиция данной фигуры
             :param direction: (tuple) Направления хода, которые есть у фигуры
-            :param last_move: (tuple) Последний ход в формате (координаты начала, координаты конца)
             :param moves: (tuple) Все возможные ходы, без учёта цвета фигур
 
         :return: (tuple) тот же moves, но с учётом "взятия на проходе"
         """
         start_y, start_x = start
+        en_passant = board.state.en_passant
 
-        if last_move:
-            last_move_start = last_move[0]
-            last_move_end = last_move[1]
-            last_piece = board.get_piece(last_move_end)
+        if en_passant:
+            last_piece = board.get_piece(en_passant)
 
             if type(last_piece) == Pawn and last_piece.color != self.color:
-                if abs(last_move_end[0] - last_move_start[0]) == 2:
-                    if abs(last_move_end[1] - start_x) == 1 and last_move_end[0] == start_y:
-                        moves.append(((start_y + direction, last_move_end[1]), 'en'))
+                if abs(en_passant[1] - start_x) == 1 and en_passant[0] == start_y:
+                    moves.append(((start_y + direction, en_passant[1]), 'en'))
         return moves
 
     @staticmethod
-    def moves_r_b_q(board, start, directions):
+    def attacks_r_b_q(board, start, directions):
         """
-        Определение всех возможных ходов для всех фигур, которые могут ходить бесконечно в своём направлении,
-        (например: ладья, слон, ферзь, а также мимик и пегас)
+        Определение всех клеток, куда могут ходить фигуры, которые ходят бесконечно в своём направлении,
+        (например: ладья, слон, ферзь, а также мимик и пегас) в виде битборда (лучи по таблицам до первой фигуры на пути),
         но без учёта цвета фигур, то есть тут можно съесть свою фигуру.
 
         Args:
@@ -95,44 +133,24 @@ class Piece:
             :param start: (tuple) Позиция данной фигуры
             :param directions: (tuple) Направления хода, которые есть у фигуры
 
-        :return: (list) Все возможные ходы без учёта цвета фигур
+        :return: (int) Битборд всех возможных ходов без учёта цвета фигур
         """
-        start_y, start_x = start
-        moves = []
-
-        for dir_x, dir_y in directions:
-            current_x, current_y = (start_y + dir_x, start_x + dir_y)
-            while board.is_valid_position((current_x, current_y)):
-                if board.get_piece((current_x, current_y)):
-                    moves.append((current_x, current_y))
-                    break
-                moves.append((current_x, current_y))
-                current_x += dir_x
-                current_y += dir_y
-        return moves
+        return slider_attacks(start[0] * 8 + start[1], board.occupied, directions)
 
     @staticmethod
-    def moves_n_k(board, start, directions):
+    def attacks_n_k(start, directions):
         """
-        Определение всех возможных ходов для всех фигур, которые могут ходить в определённом радиусе в своём направлении,
-        (например: конь, король, а также ниндзя)
+        Определение всех клеток, куда могут ходить фигуры, которые ходят в определённом радиусе в своём направлении,
+        (например: конь, король, а также ниндзя) в виде битборда (по заранее посчитанной таблице прыжков),
         но без учёта цвета фигур, то есть тут можно съесть свою фигуру.
 
         Args:
-            :param board: (object) Текущее состояние доски
             :param start: (tuple) Позиция данной фигуры
             :param directions: (tuple) Направления хода, которые есть у фигуры
 
-        :return: (list) Все возможные ходы без учёта цвета фигур
+        :return: (int) Битборд всех возможных ходов без учёта цвета фигур
         """
-        start_y, start_x = start
-        moves = []
-
-        for dir_x, dir_y in directions:
-            current_pos = (start_y + dir_x, start_x + dir_y)
-            if board.is_valid_position(current_pos):
-                moves.append(current_pos)
-        return moves
+        return LEAPS[directions][start[0] * 8 + start[1]]
 
     def not_enemy(self, board, moves):
         """
@@ -145,57 +163,58 @@ class Piece:
 
         :return: (tuple) отфильтрованный список ходов
         """
-        return [move for move in moves if not board.get_piece(move) or board.get_piece(move).color != self.color]
+        # Ход 'взятия на проходе' всегда идёт на пустую клетку, его не проверяем
+        own = board.colors[self.color]
+        return [move for move in moves if type(move[1]) == str or not own >> (move[0] * 8 + move[1]) & 1]
 
     @staticmethod
     def get_all_possible_moves(board, color):
         """
-        Получение всех ходов всех фигур данного цвета.
+        Получение всех ходов всех фигур соперника данного цвета (через movegen.generate_moves).
 
         Args:
             :param board: (object) Текущее состояние доски
-            :param color: (str) Цвет, для которого нужно найти все ходы
+            :param color: (str) Цвет, для соперника которого нужно найти все ходы
 
-        :return: (tuple) список всех ходов всех фигур
+        :return: (list) список конечных позиций всех ходов
         """
-        all_moves = []
-        for index0, row in enumerate(board.board):
-            for index1, piece in enumerate(row):
-                if piece:
-                    if piece.color != color:
-                        if piece.get_possible_moves(board, (index0, index1)):
-                            all_moves += piece.get_possible_moves(board, (index0, index1))
-        return all_moves
+        # movegen импортирует pieces, поэтому импорт здесь, а не в начале модуля
+        from movegen import OTHER_COLOR, generate_moves
+        # Превращение пешки даёт несколько ходов на одну клетку - берём клетку один раз
+        return [end for _, end, promotion in generate_moves(board, OTHER_COLOR[color]) if promotion in (None, 'Q')]
 
     @staticmethod
     def under_attack(board, color):
         """
-        Получение всех фигур, которые могут быть взяты во время следующего хода противника.
+        Получение всех фигур, которые могут быть взяты во время следующего хода противника
+        (через AttackTracker и кэш board.attack_map).
 
         Args:
             :param board: (object) Текущее состояние доски
             :param color: (str) Цвет, для которого нужно найти все фигуры под ударом
 
-        :return: (tuple) список всех фигур под ударом
+        :return: (list) список позиций всех фигур под ударом
         """
-        pieces_under_attack = []
-        for move in Piece.get_all_possible_moves(board, color):
-            if board.get_piece(move):
-                if board.get_piece(move).color == color:
-                    pieces_under_attack.append(move)
-        return pieces_under_attack
+        return list(board.attack_map(color))
 
 class Pawn(Piece):
     """
     Класс для пешек.
     """
-    def __init__(self, color):
+    __slots__ = ('direction',)
+    letter = 'P'
+
+    @classmethod
+    def _create(cls, color):
         """
-        Args:
-            :param color: (str) Цвет фигуры (символ определяется относительно цвета)
+        Пешка дополнительно хранит направление хода.
+
+        :param color: (str) Цвет фигуры
+        :return: (object) Фигура
         """
-        super().__init__(color, 'P' if color == 'white' else 'p')
-        self.direction = -1 if self.color == 'white' else 1
+        piece = super()._create(color)
+        object.__setattr__(piece, 'direction', -1 if color == 'white' else 1)
+        return piece
 
     def get_possible_moves(self, board, start):
         """
@@ -209,22 +228,14 @@ class Pawn(Piece):
         """
         return self.not_enemy(board, self.moves_p(board, start, self.direction))
 
-    def transform(self, board, end):
+    @staticmethod
+    def choose_promotion():
         """
-        Замена пешки на другую фигуру по достижению края поля,
-        ничего не возвращает, а просто ставит выбранную фигуру на место пешки.
+        Запрос у игрока фигуры для замены пешки.
 
-        Args:
-            :param board: (object) Текущее состояние доски
-            :param end: (tuple) Позиция данной пешки
+        :return: (str) Символ выбранной фигуры
         """
-        chosen_piece = input('Пешка дошла до края поля! Выберите фигуру для замены: ').upper()
-        if chosen_piece in ['R', 'B', 'Q', 'N']:
-            match chosen_piece:
-                case 'R': board.place_piece(end, Rook(self.color))
-                case 'B': board.place_piece(end, Bishop(self.color))
-                case 'Q': board.place_piece(end, Queen(self.color))
-                case 'N': board.place_piece(end, Knight(self.color))
+        return input('Пешка дошла до края поля! Выберите фигуру для замены: ').upper()
 
 
 
@@ -232,12 +243,12 @@ class Rook(Piece):
     """
     Класс для ладьи.
     """
-    def __init__(self, color):
-        super().__init__(color, 'R' if color == 'white' else 'r')
-        self.directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    __slots__ = ()
+    letter = 'R'
+    directions = ROOK_DIRECTIONS
 
     def get_possible_moves(self, board, start):
-        return self.not_enemy(board, self.moves_r_b_q(board, start, self.directions))
+        return positions(self.attacks_r_b_q(board, start, self.directions) & ~board.colors[self.color])
 
 
 
@@ -245,12 +256,12 @@ class Bishop(Piece):
     """
     Класс для слона.
     """
-    def __init__(self, color):
-        super().__init__(color, 'B' if color == 'white' else 'b')
-        self.directions = [(-1, -1), (1, 1), (-1, 1), (1, -1)]
+    __slots__ = ()
+    letter = 'B'
+    directions = BISHOP_DIRECTIONS
 
     def get_possible_moves(self, board, start):
-        return self.not_enemy(board, self.moves_r_b_q(board, start, self.directions))
+        return positions(self.attacks_r_b_q(board, start, self.directions) & ~board.colors[self.color])
 
 
 
@@ -258,12 +269,12 @@ class Queen(Piece):
     """
     Класс для королевы.
     """
-    def __init__(self, color):
-        super().__init__(color, 'Q' if color == 'white' else 'q')
-        self.directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (-1, 1), (1, -1)]
+    __slots__ = ()
+    letter = 'Q'
+    directions = QUEEN_DIRECTIONS
 
     def get_possible_moves(self, board, start):
-        return self.not_enemy(board, self.moves_r_b_q(board, start, self.directions))
+        return positions(self.attacks_r_b_q(board, start, self.directions) & ~board.colors[self.color])
 
 
 
@@ -271,12 +282,12 @@ class Knight(Piece):
     """
     Класс для коня.
     """
-    def __init__(self, color):
-        super().__init__(color, 'N' if color == 'white' else 'n')
-        self.directions = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+    __slots__ = ()
+    letter = 'N'
+    directions = KNIGHT_DIRECTIONS
 
     def get_possible_moves(self, board, start):
-        return self.not_enemy(board, self.moves_n_k(board, start, self.directions))
+        return positions(self.attacks_n_k(start, self.directions) & ~board.colors[self.color])
 
 
 
@@ -284,12 +295,12 @@ class King(Piece):
     """
     Класс для короля.
     """
-    def __init__(self, color):
-        super().__init__(color, 'K' if color == 'white' else 'k')
-        self.directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (-1, 1), (1, -1)]
+    __slots__ = ()
+    letter = 'K'
+    directions = KING_DIRECTIONS
 
     def get_possible_moves(self, board, start):
-        return self.not_enemy(board, self.moves_n_k(board, start, self.directions))
+        return positions(self.attacks_n_k(start, self.directions) & ~board.colors[self.color])
 
 
 
@@ -300,47 +311,56 @@ class Mimic(Piece):
     (даже вражеская), мимик перенимает её ходы. Если рядом с мимиком находятся разные фигуры, то он сможет ходить как смесь этих фигур.
     Мимик не атакует, то есть с его помощью нельзя съесть вражескую фигуру, а меняется местами с выбранной фигурой.
     """
-    def __init__(self, color):
-        super().__init__(color, 'M' if color == 'white' else 'm')
-        self.directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (-1, 1), (1, -1)]
+    __slots__ = ()
+    letter = 'M'
+    directions = KING_DIRECTIONS
 
     def get_possible_moves(self, board, start):
-        near_pieces = self.find_nears(board, self.directions, start)
-        moves = []
-
-        for piece in near_pieces:
-            if type(piece) in [Rook, Bishop, Queen, Pegasus]:
-                for move in piece.moves_r_b_q(board, start, piece.directions):
-                    if move not in moves:
-                        moves.append(move)
-            elif type(piece) in [Knight, King]:
-                for move in piece.moves_n_k(board, start, piece.directions):
-                    if move not in moves:
-                        moves.append(move)
-            elif type(piece) == Pawn:
-                for move in piece.moves_p(board, start, piece.direction):
-                    if move not in moves:
-                        moves.append(move)
-        return moves
+        square = start[0] * 8 + start[1]
+        directions, moves, pawns = self.copied_moves(board, square)
+        if directions:
+            moves |= slider_attacks(square, board.occupied, directions)
+
+        en_passant = []
+        for pawn in pawns:
+            moves |= pawn.attacks_p(board, start, pawn.direction)
+            pawn.en_passant(board, start, pawn.direction, en_passant)
+        return positions(moves) + en_passant
 
     @staticmethod
-    def find_nears(board, directions, start):
+    def copied_moves(board, square):
         """
-        Поиск находящихся рядом фигур в заданном радиусе.
+        Виды ходов, которые мимик перенимает у соседей. Каждый вид учитывается один раз,
+        сколько бы соседей с такими ходами ни было.
 
         Args:
             :param board: (object) Текущее состояние доски
-            :param directions: (tuple) Направления поиска
-            :param start: (tuple) Позиция фигуры, для которой ищем рядом стоящие фигуры
-        """
-        near_pieces = []
-        start_x, start_y = start
-        for direction in directions:
-            dir_x, dir_y = direction
-            if board.get_piece((start_x + dir_x, start_y + dir_y)):
-                near_pieces.append(board.get_piece((start_x + dir_x, start_y + dir_y)))
-        return near_pieces
+            :param square: (int) Номер клетки мимика
 
+        :return: (tuple) Направления дальнобойных ходов, битборд ходов коня и короля,
+                 соседние пешки (не больше одной на цвет, их ходы зависят от цвета)
+        """
+        bitboards = board.bitboards
+        near = KING_ATTACKS[square] & board.occupied
+        if not near:
+            return (), 0, ()
+
+        directions = ()
+        queens = bitboards[Queen, 'white'] | bitboards[Queen, 'black']
+        if near & (bitboards[Rook, 'white'] | bitboards[Rook, 'black'] | queens):
+            directions += ROOK_DIRECTIONS
+        if near & (bitboards[Bishop, 'white'] | bitboards[Bishop, 'black'] | queens):
+            directions += BISHOP_DIRECTIONS
+        if near & (bitboards[Pegasus, 'white'] | bitboards[Pegasus, 'black']):
+            directions += PEGASUS_DIRECTIONS
+
+        leaps = 0
+        if near & (bitboards[Knight, 'white'] | bitboards[Knight, 'black']):
+            leaps |= KNIGHT_ATTACKS[square]
+        if near & (bitboards[King, 'white'] | bitboards[King, 'black']):
+            leaps |= KING_ATTACKS[square]
+        pawns = tuple(Pawn(color) for color in ('white', 'black') if near & bitboards[Pawn, color])
+        return directions, leaps, pawns
 
 
 class Pegasus(Piece):
@@ -348,12 +368,12 @@ class Pegasus(Piece):
     Класс для пегаса.
     Пегас - новая фигура. Ходит как конь, но бесконечно в выбранном направлении, если на пути нет фигур.
     """
-    def __init__(self, color):
-        super().__init__(color, 'G' if color == 'white' else 'g')
-        self.directions = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+    __slots__ = ()
+    letter = 'G'
+    directions = PEGASUS_DIRECTIONS
 
     def get_possible_moves(self, board, start):
-        return self.not_enemy(board, self.moves_r_b_q(board, start, self.directions))
+        return positions(self.attacks_r_b_q(board, start, self.directions) & ~board.colors[self.color])
 
 
 
@@ -363,9 +383,13 @@ class Ninja(Piece):
     Ниндзя - новая фигура. Ходит через 1 клетку вертикально, горизонтально и диагонально,
     в общем как король, только пропускает клетку перед собой.
     """
-    def __init__(self, color):
-        super().__init__(color, 'J' if color == 'white' else 'j')
-        self.directions = [(2, 0), (-2, 0), (0, 2), (0, -2), (2, 2), (2, -2), (-2, 2), (-2, -2)]
+    __slots__ = ()
+    letter = 'J'
+    directions = NINJA_DIRECTIONS
 
     def get_possible_moves(self, board, start):
-        return self.not_enemy(board, self.moves_n_k(board, start, self.directions))
\ No newline at end of file
+        return positions(self.attacks_n_k(start, self.directions) & ~board.colors[self.color])
+
+
+# Фигуры, на которые можно заменить пешку, по символу
+PROMOTIONS = {'R': Rook, 'B': Bishop, 'Q': Queen, 'N': Knight}
@@ -0,0 +1,184 @@
+"""
+Замеры времени в горячих местах: число вызовов и суммарное время (вместе с вложенными вызовами,
+рекурсивные вызовы время не удваивают):
+    Board.attack_map, Board.possible_moves, Board.legal_moves - отдельно попадания и промахи кэша доски;
+    AttackTracker.attacked, movegen.legal_moves, get_possible_moves каждого класса фигур;
+    Engine.alpha_beta и Engine.quiescence, Board.get_piece и вывод доски (Renderer.draw).
+
+Включается переменной окружения CHESS_PROFILE (проверяется при создании Game, в main.py, replay.py
+и в процессах-исполнителях движка):
+    CHESS_PROFILE=1          сводка в JSON печатается в stderr при выходе
+    CHESS_PROFILE=путь.json  сводка записывается в файл при выходе ('{pid}' в пути заменяется номером процесса)
+Без переменной ничего не подменяется и замеры ничего не стоят. Сводку можно получить в любой момент
+через summary()/dump(), а в Unix - сигналом SIGUSR1.
+"""
+import functools
+import os
+import sys
+import time
+
+ENVIRONMENT_VARIABLE = 'CHESS_PROFILE'
+
+# Имя замера -> [число вызовов, суммарное время в секундах]
+counters = {}
+_started = time.perf_counter()
+_installed = False
+
+
+def timed(name, function):
+    """
+    Обёртка функции, которая считает вызовы и время.
+
+    Args:
+        :param name: (str) Имя замера
+        :param function: (function) Исходная функция
+
+    :return: (function) Функция с замером
+    """
+    counter = counters.setdefault(name, [0, 0.0])
+    clock = time.perf_counter
+    # Время считается только для внешнего вызова, иначе рекурсивный перебор учитывался бы многократно
+    active = [False]
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        counter[0] += 1
+        if active[0]:
+            return function(*args, **kwargs)
+        active[0] = True
+        started = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            active[0] = False
+            counter[1] += clock() - started
+
+    return wrapper
+
+
+def timed_cache(name, method):
+    """
+    Обёртка метода доски с кэшем ходов (Board.move_cache): попадания и промахи кэша считаются отдельно.
+
+    Args:
+        :param name: (str) Имя замера
+        :param method: (function) Исходный метод
+
+    :return: (function) Метод с замером
+    """
+    hits = counters.setdefault(f'{name} (попадание)', [0, 0.0])
+    misses = counters.setdefault(f'{name} (промах)', [0, 0.0])
+    clock = time.perf_counter
+
+    @functools.wraps(method)
+    def wrapper(board, *args, **kwargs):
+        cache = board.move_cache
+        missed = cache.misses
+        started = clock()
+        try:
+            return method(board, *args, **kwargs)
+        finally:
+            counter = misses if cache.misses != missed else hits
+            counter[0] += 1
+            counter[1] += clock() - started
+
+    return wrapper
+
+
+def install():
+    """
+    Подмена методов горячих мест обёртками с замерами (повторный вызов ничего не делает).
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    import attacks
+    import board
+    import engine
+    import movegen
+    import pieces
+    import render
+    import tablebase
+
+    for piece_type in (pieces.Pawn, pieces.Rook, pieces.Knight, pieces.Bishop, pieces.Queen, pieces.King,
+                       pieces.Mimic, pieces.Pegasus, pieces.Ninja):
+        piece_type.get_possible_moves = timed(f'{piece_type.__name__}.get_possible_moves',
+                                              piece_type.__dict__['get_possible_moves'])
+    for name in ('attack_map', 'possible_moves', 'legal_moves'):
+        setattr(board.Board, name, timed_cache(f'Board.{name}', board.Board.__dict__[name]))
+    attacks.AttackTracker.attacked = timed('AttackTracker.attacked', attacks.AttackTracker.__dict__['attacked'])
+    # legal_moves импортирована в модули по имени, поэтому обёртку надо подставить и туда
+    legal_moves = timed('movegen.legal_moves', movegen.legal_moves)
+    for module in (movegen, board, engine, tablebase):
+        module.legal_moves = legal_moves
+    for name in ('alpha_beta', 'quiescence'):
+        setattr(engine.Engine, name, timed(f'Engine.{name}', engine.Engine.__dict__[name]))
+    board.Board.get_piece = timed('Board.get_piece', board.Board.__dict__['get_piece'])
+    render.Renderer.draw = timed('Renderer.draw', render.Renderer.__dict__['draw'])
+
+
+def summary():
+    """
+    Сводка замеров.
+
+    :return: (dict) Номер процесса, время работы и для каждого замера - число вызовов,
+             суммарное и среднее время (замеры без вызовов пропускаются)
+    """
+    return {
+        'pid': os.getpid(),
+        'elapsed': time.perf_counter() - _started,
+        'functions': {name: {'calls': calls, 'seconds': seconds, 'mean_us': seconds / calls * 1e6}
+                      for name, (calls, seconds) in sorted(counters.items(), key=lambda item: -item[1][1])
+                      if calls},
+    }
+
+
+def dump(path=None):
+    """
+    Вывод сводки в JSON.
+
+    Args:
+        :param path: (str) Файл для записи ('{pid}' заменяется номером процесса) или None для stderr
+    """
+    import json
+
+    text = json.dumps(summary(), ensure_ascii=False, indent=2)
+    if path:
+        with open(path.replace('{pid}', str(os.getpid())), 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text, file=sys.stderr)
+
+
+def reset():
+    """
+    Обнуление замеров.
+    """
+    global _started
+    for counter in counters.values():
+        counter[0], counter[1] = 0, 0.0
+    _started = time.perf_counter()
+
+
+def enable_from_environment():
+    """
+    Включение замеров, если задана переменная окружения CHESS_PROFILE: подмена методов,
+    вывод сводки при выходе и по сигналу SIGUSR1.
+    """
+    value = os.environ.get(ENVIRONMENT_VARIABLE)
+    if not value or _installed:
+        return
+    import atexit
+    import signal
+
+    install()
+    path = None if value == '1' else value
+    atexit.register(dump, path)
+    if hasattr(signal, 'SIGUSR1'):
+        try:
+            signal.signal(signal.SIGUSR1, lambda signum, frame: dump(path))
+        except ValueError:
+            # Обработчик сигнала можно поставить только из главного потока
+            pass
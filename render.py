@@ -0,0 +1,101 @@
+"""
+Вывод доски в терминал. Кадр собирается в одну строку и выводится одной записью.
+В инкрементальном режиме доска стоит в начале экрана, и после первого кадра перерисовываются
+только клетки, у которых изменилась фигура или подсветка (ANSI-перемещения курсора), что важно при работе по SSH.
+"""
+import sys
+
+LETTERS = '   A B C D E F G H\n'
+BORDER = ' +—————————————————+\n'
+MOVE_COLOR = '\x1B[1;41m'      # клетки, куда может пойти выбранная фигура
+RISKY_COLOR = '\x1B[1;45m'     # клетки хода, где выбранную фигуру смогут взять
+ATTACKED_COLOR = '\x1B[1;43m'  # фигуры под боем
+RESET = '\x1B[0m'
+CLEAR_SCREEN = '\x1B[H\x1B[2J'
+CLEAR_BELOW = '\x1B[J'
+# Строка экрана (с 1) первой строки доски и строка сразу под кадром
+FIRST_ROW = 3
+BELOW_FRAME = 13
+
+
+def cell_text(piece, highlight=''):
+    """
+    Текст клетки с подсветкой.
+
+    Args:
+        :param piece: (object) Фигура или None
+        :param highlight: (str) ANSI-код цвета подсветки или пустая строка
+
+    :return: (str) Текст клетки
+    """
+    symbol = piece.symbol if piece else '.'
+    return f'{highlight}{symbol}{RESET}' if highlight else symbol
+
+
+class Renderer:
+    """
+    Вывод кадров доски в поток (по умолчанию - стандартный вывод).
+    """
+    def __init__(self, stream=None, incremental=False):
+        """
+        Args:
+            :param stream: (object) Поток для вывода
+            :param incremental: (bool) Перерисовывать только изменившиеся клетки
+        """
+        self.stream = stream or sys.stdout
+        self.incremental = incremental
+        self.previous = None
+
+    @staticmethod
+    def cells(board, moves=(), attacked=(), risky=()):
+        """
+        Тексты всех 64 клеток кадра.
+
+        Args:
+            :param board: (object) Текущее состояние доски
+            :param moves: (set) Позиции, куда может пойти выбранная фигура (красная подсветка)
+            :param attacked: (set) Позиции фигур под боем (жёлтая подсветка)
+            :param risky: (set) Позиции из moves, где фигуру смогут взять (фиолетовая подсветка)
+
+        :return: (list) Тексты клеток по строкам сверху вниз
+        """
+        return [cell_text(piece, RISKY_COLOR if (index0, index1) in risky else
+                          MOVE_COLOR if (index0, index1) in moves else
+                          ATTACKED_COLOR if (index0, index1) in attacked else '')
+                for index0, row in enumerate(board.board) for index1, piece in enumerate(row)]
+
+    @staticmethod
+    def frame(cells):
+        """
+        Полный кадр: буквы столбцов, рамка и строки доски с номерами.
+
+        :param cells: (list) Тексты клеток из Renderer.cells
+        :return: (str) Кадр
+        """
+        rows = [f"{8 - index0}| {' '.join(cells[index0 * 8:index0 * 8 + 8])} |{8 - index0}\n" for index0 in range(8)]
+        return f"{LETTERS}{BORDER}{''.join(rows)}{BORDER}{LETTERS}"
+
+    def draw(self, board, moves=(), attacked=(), blank_line=False, risky=()):
+        """
+        Вывод кадра одной записью в поток.
+
+        Args:
+            :param board: (object) Текущее состояние доски
+            :param moves: (set) Позиции, куда может пойти выбранная фигура
+            :param attacked: (set) Позиции фигур под боем
+            :param blank_line: (bool) Отделить кадр пустой строкой (только в обычном режиме)
+            :param risky: (set) Позиции из moves, где фигуру смогут взять
+        """
+        cells = self.cells(board, moves, attacked, risky)
+        if not self.incremental:
+            text = ('\n' if blank_line else '') + self.frame(cells)
+        elif self.previous is None:
+            text = CLEAR_SCREEN + self.frame(cells)
+        else:
+            # Клетка (y, x) стоит в строке FIRST_ROW + y и столбце 4 + 2x, текст под доской стирается
+            text = ''.join(f'\x1B[{FIRST_ROW + square // 8};{4 + square % 8 * 2}H{cell}'
+                           for square, (cell, old) in enumerate(zip(cells, self.previous)) if cell != old)
+            text += f'\x1B[{BELOW_FRAME};1H{CLEAR_BELOW}'
+        self.previous = cells
+        self.stream.write(text)
+        self.stream.flush()
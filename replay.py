@@ -0,0 +1,209 @@
+"""
+Проверка записанных партий без ввода с клавиатуры. Партия - список ходов в той же записи, что и в move_history:
+пары координат ('e2', 'e4'), при превращении пешки третьим элементом идёт символ фигуры ('e7', 'e8', 'Q').
+В файле партия - строка из ходов через пробел: 'e2e4 d7d5 e7e8Q'.
+
+Партии обрабатываются цепочкой генераторов (чтение -> разбор -> проигрывание), поэтому файл любого размера
+не держится в памяти целиком. В режиме нескольких процессов партии проверяются пачками в ProcessPoolExecutor.
+
+Запуск: python replay.py ФАЙЛ [--workers N]
+"""
+import argparse
+import concurrent.futures
+import time
+from collections import deque
+
+from board import Board, START_FEN
+from movegen import in_check
+from pieces import Pawn, PROMOTIONS
+import profiling
+
+
+class GameResult:
+    """
+    Результат проверки одной партии.
+    """
+    def __init__(self, index, moves, error=None, fen=None):
+        """
+        Args:
+            :param index: (int) Номер партии в потоке (с нуля)
+            :param moves: (int) Количество правильных ходов, сделанных до ошибки (или всех ходов партии)
+            :param error: (str) Описание первого неправильного хода или None, если партия правильная
+            :param fen: (str) Позиция в конце партии (или перед неправильным ходом)
+        """
+        self.index = index
+        self.moves = moves
+        self.error = error
+        self.fen = fen
+
+    @property
+    def ok(self):
+        """
+        Партия правильная, если в ней нет ошибок.
+        """
+        return self.error is None
+
+    def __repr__(self):
+        return f'GameResult({self.index}, {self.moves}, {self.error!r})'
+
+
+def parse_game(line):
+    """
+    Разбор строки с партией.
+
+    Args:
+        :param line: (str) Ходы через пробел, например 'e2e4 d7d5'
+
+    :return: (list) Ходы в виде кортежей ('e2', 'e4') или ('e7', 'e8', 'Q')
+    """
+    return [(move[:2], move[2:4], move[4:]) if len(move) > 4 else (move[:2], move[2:4]) for move in line.split()]
+
+
+def read_games(lines):
+    """
+    Генератор партий из строк файла (пустые строки и строки с '#' в начале пропускаются).
+
+    Args:
+        :param lines: (iterable) Строки файла
+
+    :return: (generator) Партии в виде списков ходов
+    """
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield parse_game(line)
+
+
+def check_coordinates(position):
+    """
+    Проверка записи клетки.
+
+    :param position: (str) Клетка в формате 'e2'
+    :return: (bool) истина, если запись правильная
+    """
+    return len(position) == 2 and position[0] in 'abcdefgh' and position[1] in '12345678'
+
+
+def replay_game(moves, index=0, fen=START_FEN):
+    """
+    Проигрывание партии с проверкой каждого хода по тем же правилам, что и в Game.start:
+    ходит фигура нужного цвета, ход есть в get_possible_moves и после него свой король не под боем.
+
+    Args:
+        :param moves: (list) Ходы партии
+        :param index: (int) Номер партии в потоке
+        :param fen: (str) Начальная позиция
+
+    :return: (object) Результат проверки (GameResult)
+    """
+    board = Board.from_fen(fen)
+    for number, move in enumerate(moves):
+        start, end = move[0], move[1]
+        promotion = move[2].upper() if len(move) > 2 else None
+
+        def fail(reason):
+            return GameResult(index, number, f"ход {number + 1} ({start}{end}): {reason}", board.to_fen())
+
+        if not check_coordinates(start) or not check_coordinates(end):
+            return fail('некорректная запись клетки')
+        index_start = board.position_to_indices(start)
+        index_end = board.position_to_indices(end)
+        piece = board.get_piece(index_start)
+        if not piece:
+            return fail('на этой позиции нет фигуры')
+        if piece.color != board.state.turn:
+            return fail('ход чужой фигурой')
+
+        possible_moves = piece.get_possible_moves(board, index_start)
+        if index_end not in possible_moves and (index_end, 'en') not in possible_moves:
+            return fail('недопустимый ход')
+        if type(piece) == Pawn and (index_end[0] == 0 or index_end[0] == 7):
+            if promotion not in PROMOTIONS:
+                return fail('не указана фигура для превращения пешки')
+        elif promotion:
+            return fail('превращение возможно только для пешки на крайней горизонтали')
+
+        color = board.state.turn
+        board.make_move(index_start, index_end, promotion)
+        if in_check(board, color):
+            board.unmake_move()
+            return fail('король остаётся под боем')
+    return GameResult(index, len(moves), fen=board.to_fen())
+
+
+def _replay_chunk(chunk):
+    """
+    Задание для процесса-исполнителя: проверка пачки партий.
+
+    :param chunk: (list) Пары (номер партии, ходы)
+    :return: (list) Результаты проверки
+    """
+    return [replay_game(moves, index) for index, moves in chunk]
+
+
+def _chunks(games, size):
+    """
+    Генератор пачек партий с их номерами.
+
+    :param games: (iterable) Партии
+    :param size: (int) Размер пачки
+    :return: (generator) Списки пар (номер партии, ходы)
+    """
+    chunk = []
+    for index, moves in enumerate(games):
+        chunk.append((index, moves))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def replay_games(games, workers=1, chunk_size=256):
+    """
+    Генератор результатов проверки потока партий (в том же порядке, что и партии).
+
+    Args:
+        :param games: (iterable) Партии в виде списков ходов
+        :param workers: (int) Количество процессов (1 - проверка в текущем процессе)
+        :param chunk_size: (int) Сколько партий отдаётся процессу за раз
+
+    :return: (generator) Результаты проверки (GameResult)
+    """
+    if workers <= 1:
+        for index, moves in enumerate(games):
+            yield replay_game(moves, index)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        # В работе держим не больше двух пачек на процесс, чтобы не читать весь поток сразу
+        pending = deque()
+        for chunk in _chunks(games, chunk_size):
+            pending.append(executor.submit(_replay_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Проверка записанных партий.')
+    parser.add_argument('path', help='файл с партиями, по одной в строке')
+    parser.add_argument('--workers', type=int, default=1, help='количество процессов')
+    parser.add_argument('--errors', type=int, default=20, help='сколько ошибок вывести')
+    arguments = parser.parse_args()
+    profiling.enable_from_environment()
+
+    started = time.perf_counter()
+    total = failed = moves = 0
+    with open(arguments.path, encoding='utf-8') as file:
+        for result in replay_games(read_games(file), arguments.workers):
+            total += 1
+            moves += result.moves
+            if not result.ok:
+                failed += 1
+                if failed <= arguments.errors:
+                    print(f'Партия {result.index + 1}: {result.error}')
+    elapsed = time.perf_counter() - started
+    print(f'Партий: {total}, с ошибками: {failed}, ходов: {moves}, {elapsed:.2f} s '
+          f'({total / elapsed if elapsed else 0:.0f} партий/s)')
@@ -0,0 +1,167 @@
+"""
+Сервер партий на asyncio: одно соединение - одна партия (Game), все партии в одном цикле событий.
+Строковый протокол, одна команда в строке, ответ - одна строка 'ok ...' или 'error <причина>':
+
+    new [white|black]   новая партия (цвет компьютера, по умолчанию - игра двух людей) -> ok <позиция FEN>
+    move e2 e4 [Q]      ход, при превращении пешки - символ фигуры -> ok <позиция FEN> [<ход компьютера>]
+    undo                отмена хода -> ok <позиция FEN>
+    board               текущая позиция -> ok <позиция FEN>
+    moves e2            куда может пойти фигура -> ok <клетки через пробел>
+    status              состояние партии -> ok check|checkmate|stalemate|repetition|-
+    quit                закрыть соединение -> ok bye
+
+Запуск: python server.py [--host H] [--port P] или python server.py --unix ПУТЬ
+(с дебютной книгой и таблицами эндшпилей: --book book.bin --tablebases tablebases)
+Проверка вручную: nc localhost 8765
+"""
+import argparse
+import asyncio
+
+from book import OpeningBook
+from engine import Engine
+from main import Game, MoveError
+from tablebase import open_tablebases
+
+# Очередь ещё не принятых соединений: при одновременном подключении тысяч игроков стандартной (100) не хватает
+BACKLOG = 4096
+
+
+class GameServer:
+    """
+    Сервер партий. Движок у всех партий общий, перебор идёт в отдельном потоке по одному,
+    чтобы цикл событий продолжал обслуживать остальных игроков.
+    """
+    def __init__(self, time_limit=0.1, book=None, tablebases=None):
+        """
+        Args:
+            :param time_limit: (float) Время компьютера на ход в секундах
+            :param book: (object) Дебютная книга (book.OpeningBook) или None
+            :param tablebases: (dict) Таблицы эндшпилей (материал -> tablebase.Tablebase) или None
+        """
+        self.engine = Engine(time_limit, book=book, tablebases=tablebases)
+        self.engine_lock = asyncio.Lock()
+        self.sessions = 0
+
+    async def handle(self, reader, writer):
+        """
+        Обслуживание одного соединения: чтение команд и ответы на них до quit или закрытия соединения.
+
+        Args:
+            :param reader: (object) Поток чтения соединения
+            :param writer: (object) Поток записи соединения
+        """
+        self.sessions += 1
+        game = Game()
+        try:
+            while line := await reader.readline():
+                command, *arguments = line.decode('utf-8', 'replace').split() or ('',)
+                if command == 'quit':
+                    writer.write(b'ok bye\n')
+                    break
+                try:
+                    game, reply = await self.execute(game, command, arguments)
+                    writer.write(f'ok {reply}\n'.encode())
+                except MoveError as error:
+                    writer.write(f'error {error}\n'.encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def execute(self, game, command, arguments):
+        """
+        Выполнение одной команды протокола.
+
+        Args:
+            :param game: (object) Партия соединения
+            :param command: (str) Команда
+            :param arguments: (list) Аргументы команды
+
+        :return: (tuple) Партия (new создаёт новую) и текст ответа после 'ok'
+        """
+        if command == 'new':
+            ai_color = arguments[0] if arguments else None
+            if ai_color not in (None, 'white', 'black'):
+                raise MoveError('Цвет компьютера - white или black.')
+            game = Game(ai_color, engine=self.engine if ai_color else None)
+            reply = game.board.to_fen()
+            if ai_color == 'white':
+                reply += ' ' + await self.computer_move(game)
+            return game, reply
+
+        if command == 'move':
+            if len(arguments) not in (2, 3):
+                raise MoveError('Формат хода: move e2 e4 [Q].')
+            if game.status() in ('checkmate', 'stalemate', 'repetition'):
+                raise MoveError('Партия окончена.')
+            game.play(*arguments)
+            reply = game.board.to_fen()
+            if game.current_turn == game.ai_color and game.board.legal_moves():
+                reply += ' ' + await self.computer_move(game)
+            return game, reply
+
+        if command == 'undo':
+            game.undo()
+            return game, game.board.to_fen()
+        if command == 'board':
+            return game, game.board.to_fen()
+        if command == 'status':
+            return game, game.status() or '-'
+        if command == 'moves':
+            if len(arguments) != 1:
+                raise MoveError('Формат: moves e2.')
+            index_start, piece = game.select(arguments[0])
+            targets = {move[1] for move in game.board.legal_moves() if move[0] == index_start}
+            return game, ' '.join(sorted(game.board.indices_to_position(target) for target in targets)) or '-'
+        raise MoveError(f'Неизвестная команда: {command}')
+
+    async def computer_move(self, game):
+        """
+        Ход компьютера в отдельном потоке.
+
+        :param game: (object) Партия
+        :return: (str) Ход компьютера, например 'e7e5' или 'b2b1Q'
+        """
+        async with self.engine_lock:
+            start, end, promotion = await asyncio.to_thread(game.computer_move)
+        return f'{start}{end}{promotion or ""}'
+
+
+async def serve(host='127.0.0.1', port=8765, path=None, time_limit=0.1, book=None, tablebases=None):
+    """
+    Запуск сервера до остановки процесса.
+
+    Args:
+        :param host: (str) Адрес для TCP
+        :param port: (int) Порт для TCP
+        :param path: (str) Путь к Unix-сокету (если задан, TCP не используется)
+        :param time_limit: (float) Время компьютера на ход в секундах
+        :param book: (object) Дебютная книга или None
+        :param tablebases: (dict) Таблицы эндшпилей или None
+    """
+    game_server = GameServer(time_limit, book, tablebases)
+    if path:
+        server = await asyncio.start_unix_server(game_server.handle, path, backlog=BACKLOG)
+    else:
+        server = await asyncio.start_server(game_server.handle, host, port, backlog=BACKLOG)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Сервер шахматных партий.')
+    parser.add_argument('--host', default='127.0.0.1', help='адрес для TCP')
+    parser.add_argument('--port', type=int, default=8765, help='порт для TCP')
+    parser.add_argument('--unix', help='путь к Unix-сокету вместо TCP')
+    parser.add_argument('--time', type=float, default=0.1, help='время компьютера на ход в секундах')
+    parser.add_argument('--book', help='файл дебютной книги (python book.py)')
+    parser.add_argument('--tablebases', help='каталог таблиц эндшпилей (python tablebase.py)')
+    arguments = parser.parse_args()
+    book = OpeningBook.open(arguments.book) if arguments.book else None
+    tablebases = open_tablebases(arguments.tablebases) if arguments.tablebases else None
+    try:
+        asyncio.run(serve(arguments.host, arguments.port, arguments.unix, arguments.time, book, tablebases))
+    except KeyboardInterrupt:
+        pass
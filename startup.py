@@ -0,0 +1,68 @@
+"""
+Замер холодного старта: сколько новый процесс тратит на импорт модулей и первую работу
+сверх запуска пустого интерпретатора. Так стартуют процессы-исполнители ParallelEngine и replay.py,
+которые живут недолго, поэтому время старта для них ограничено бюджетом BUDGETS.
+
+Интерпретаторы запускаются с -S (без site): .pth-файлы установленных пакетов заранее загружают модули
+стандартной библиотеки (re, pathlib, ...), и тогда замер зависит от окружения, а не от кода.
+
+Запуск: python startup.py [--runs N]  (код возврата 1, если какой-то сценарий не уложился в бюджет)
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# Сценарий -> код, который выполняет новый процесс
+SCENARIOS = {
+    'board': 'from board import Board, START_FEN; Board.from_fen(START_FEN).legal_moves()',
+    'worker': ('from board import Board, START_FEN; from engine import _search_root_move; '
+               '_search_root_move(Board.from_fen(START_FEN).to_bytes(), ((6, 4), (4, 4), None), 2, None, 1)'),
+    'import main': 'import main',
+}
+# Бюджет сценария в секундах сверх пустого интерпретатора. Замер при установке бюджета: board 6 ms,
+# worker 11 ms, import main 7 ms - запас в 2.5-4 раза на медленные машины и шум.
+BUDGETS = {'board': 0.015, 'worker': 0.030, 'import main': 0.030}
+
+
+def measure(code, runs):
+    """
+    Медиана времени работы нового интерпретатора, который выполняет код.
+
+    Args:
+        :param code: (str) Код для python -c
+        :param runs: (int) Количество запусков
+
+    :return: (float) Время в секундах
+    """
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-S', '-c', code], check=True, stdin=subprocess.DEVNULL)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def startup_report(runs=10):
+    """
+    Замер всех сценариев.
+
+    :param runs: (int) Количество запусков каждого сценария
+    :return: (list) Строки (сценарий, время сверх пустого интерпретатора, бюджет)
+    """
+    baseline = measure('pass', runs)
+    return [(name, measure(code, runs) - baseline, BUDGETS[name]) for name, code in SCENARIOS.items()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Замер холодного старта процессов.')
+    parser.add_argument('--runs', type=int, default=10, help='количество запусков каждого сценария')
+    arguments = parser.parse_args()
+    over = 0
+    for name, elapsed, budget in startup_report(arguments.runs):
+        status = 'ok' if elapsed <= budget else 'ПРЕВЫШЕН'
+        over += elapsed > budget
+        print(f'{name:<12} {elapsed * 1000:6.1f} ms (бюджет {budget * 1000:.0f} ms) {status}')
+    if over:
+        raise SystemExit(1)
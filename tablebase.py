@@ -0,0 +1,400 @@
+"""
+Таблицы эндшпилей без пешек (король с одной-двумя фигурами против короля), посчитанные ретроградным анализом
+по правилам ходов pieces.py/movegen.py: для каждой позиции - выигрыш, проигрыш или ничья для того, кто ходит,
+и число полуходов до мата.
+
+Материал записывается как 'KGvK' (король и пегас против короля), 'KJvK', 'KMNvK' и т.п.: буквы фигур белых,
+'v', буквы фигур чёрных. Без пешек доска симметрична, поэтому белый король приводится одной из 8 симметрий
+в треугольник a8-d8-d5 (10 клеток), и в таблице только такие позиции.
+
+Файл таблицы - заголовок и по байту на позицию; он открывается через mmap, поэтому поиск в таблице
+не требует загрузки файла (читаются только нужные страницы). Байт: 0 - ничья, 255 - позиции нет
+(невозможна или приводится к другой симметрией), иначе число полуходов до мата + 1
+(чётное число полуходов - тот, кто ходит, проигрывает, нечётное - выигрывает).
+
+Подсчёт: python tablebase.py KGvK KJvK KMvK [--directory tablebases]
+Таблица с тремя фигурами считается около 10 секунд (80 КБ), с четырьмя (например, KGMvK) - около 7 минут
+и нескольких сотен мегабайт памяти (5 МБ на диске).
+"""
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from bitboard import SQUARES, positions
+from board import Board
+from movegen import OTHER_COLOR, legal_moves, in_check
+from pieces import Rook, Knight, Bishop, Queen, King, Mimic, Pegasus, Ninja
+
+# Буква фигуры -> тип (пешек в таблицах нет: с ними доска несимметрична)
+LETTERS = {piece_type.letter: piece_type for piece_type in (Queen, Rook, Bishop, Knight, Pegasus, Ninja, Mimic)}
+ORDER = 'QRBNGJM'
+HEADER = struct.Struct('<4sB15s')
+MAGIC = b'MTB1'
+EXTENSION = '.mtb'
+
+DRAW = 0
+UNKNOWN = 254
+MISSING = 255
+
+
+def _symmetry(transform):
+    """
+    Отображение клеток при симметрии доски.
+
+    :param transform: (function) Преобразование (y, x) -> (y, x)
+    :return: (tuple) Номер клетки -> номер клетки после симметрии
+    """
+    return tuple(y * 8 + x for y, x in (transform(y, x) for y, x in SQUARES))
+
+
+SYMMETRIES = tuple(_symmetry(transform) for transform in (
+    lambda y, x: (y, x), lambda y, x: (y, 7 - x), lambda y, x: (7 - y, x), lambda y, x: (7 - y, 7 - x),
+    lambda y, x: (x, y), lambda y, x: (x, 7 - y), lambda y, x: (7 - x, y), lambda y, x: (7 - x, 7 - y)))
+# Клетки белого короля в таблице: строки 0-3 (a8-d5), столбец не дальше строки
+TRIANGLE = tuple(y * 8 + x for y in range(4) for x in range(y + 1))
+TRIANGLE_INDEX = {square: index for index, square in enumerate(TRIANGLE)}
+# Клетка короля -> симметрии, которые переводят её в треугольник
+KING_SYMMETRIES = tuple(tuple(symmetry for symmetry in SYMMETRIES if symmetry[square] in TRIANGLE_INDEX)
+                        for square in range(64))
+
+
+def parse_material(material):
+    """
+    Разбор записи материала.
+
+    Args:
+        :param material: (str) Материал, например 'KGvK' или 'KMNvK'
+
+    :return: (tuple) Каноническая запись (фигуры в порядке ORDER) и фигуры таблицы (тип, цвет):
+             белый король, остальные белые, чёрный король, остальные чёрные
+    """
+    sides = material.upper().split('V')
+    if len(sides) != 2 or any(side.count('K') != 1 for side in sides):
+        raise ValueError(f'Материал записывается как KGvK (по одному королю с каждой стороны): {material}')
+    pieces = []
+    names = []
+    for color, side in zip(('white', 'black'), sides):
+        letters = sorted(side.replace('K', ''), key=lambda letter: ORDER.find(letter))
+        if any(letter not in LETTERS for letter in letters):
+            raise ValueError(f'В таблицах бывают только фигуры {ORDER} (без пешек): {material}')
+        names.append('K' + ''.join(letters))
+        pieces += [(King, color)] + [(LETTERS[letter], color) for letter in letters]
+    return 'v'.join(names), tuple(pieces)
+
+
+def board_material(board):
+    """
+    Материал позиции в записи parse_material (например, 'KGvK').
+
+    :param board: (object) Доска
+    :return: (str) Материал или None, если на доске есть пешки или нет королей
+    """
+    names = []
+    for color in ('white', 'black'):
+        if board.bitboards[King, color].bit_count() != 1:
+            return None
+        names.append('K' + ''.join(letter * board.bitboards[LETTERS[letter], color].bit_count() for letter in ORDER))
+    if len(''.join(names)) != board.occupied.bit_count():
+        return None
+    return 'v'.join(names)
+
+
+class Tablebase:
+    """
+    Таблица одного материала. Значения - любой буфер байтов: bytearray при подсчёте или mmap файла.
+    """
+    def __init__(self, material, values=None):
+        """
+        Args:
+            :param material: (str) Материал, например 'KGvK'
+            :param values: (object) Байты значений (по умолчанию - пустая таблица)
+        """
+        self.material, self.pieces = parse_material(material)
+        # Фигуры одного типа и цвета -> номера их мест в таблице
+        self.groups = {}
+        for slot, piece in enumerate(self.pieces):
+            self.groups.setdefault(piece, []).append(slot)
+        self.size = 2 * len(TRIANGLE) * 64 ** (len(self.pieces) - 1)
+        self.values = values if values is not None else bytearray([MISSING]) * self.size
+        if len(self.values) != self.size:
+            raise ValueError(f'Размер таблицы {self.material} должен быть {self.size}, а не {len(self.values)}')
+
+    def index(self, turn, squares):
+        """
+        Номер позиции в таблице с учётом симметрий (наименьший номер среди симметричных позиций).
+
+        Args:
+            :param turn: (str) Цвет, который ходит
+            :param squares: (list) Клетки фигур в порядке self.pieces
+
+        :return: (int) Номер позиции
+        """
+        best = None
+        for symmetry in KING_SYMMETRIES[squares[0]]:
+            index = 0 if turn == 'white' else 1
+            index = index * len(TRIANGLE) + TRIANGLE_INDEX[symmetry[squares[0]]]
+            for square in squares[1:]:
+                index = index * 64 + symmetry[square]
+            if best is None or index < best:
+                best = index
+        return best
+
+    def position(self, index):
+        """
+        Позиция по номеру (обратное к index без учёта симметрий).
+
+        :param index: (int) Номер позиции
+        :return: (tuple) Цвет, который ходит, и клетки фигур в порядке self.pieces
+        """
+        squares = []
+        for _ in self.pieces[1:]:
+            index, square = divmod(index, 64)
+            squares.append(square)
+        turn, king = divmod(index, len(TRIANGLE))
+        squares.append(TRIANGLE[king])
+        return ('white', 'black')[turn], squares[::-1]
+
+    def squares(self, board):
+        """
+        Клетки фигур доски в порядке self.pieces.
+
+        :param board: (object) Доска с материалом этой таблицы
+        :return: (list) Номера клеток
+        """
+        squares = [0] * len(self.pieces)
+        for piece, slots in self.groups.items():
+            for slot, (y, x) in zip(slots, positions(board.bitboards[piece])):
+                squares[slot] = y * 8 + x
+        return squares
+
+    def code(self, board):
+        """
+        Байт таблицы для позиции на доске (материал доски должен совпадать с материалом таблицы).
+
+        :param board: (object) Доска
+        :return: (int) Значение из таблицы
+        """
+        return self.values[self.index(board.state.turn, self.squares(board))]
+
+    def probe(self, board):
+        """
+        Результат позиции для того, кто ходит.
+
+        Args:
+            :param board: (object) Доска
+
+        :return: (tuple) 'win', 'loss' или 'draw' и число полуходов до мата (для ничьей - 0)
+                 или None, если позиции нет в таблице
+        """
+        if board_material(board) != self.material:
+            return None
+        return decode(self.code(board))
+
+    def save(self, path):
+        """
+        Запись таблицы в файл.
+
+        :param path: (str) Путь к файлу
+        """
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, len(self.pieces), self.material.encode('ascii')))
+            file.write(self.values)
+
+    @classmethod
+    def open(cls, path):
+        """
+        Открытие файла таблицы через mmap (файл не читается целиком).
+
+        Args:
+            :param path: (str) Путь к файлу
+
+        :return: (object) Таблица
+        """
+        with open(path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, material = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f'{path} - не файл таблицы эндшпиля')
+        return cls(material.rstrip(b'\0').decode('ascii'), memoryview(data)[HEADER.size:])
+
+
+def decode(code):
+    """
+    Расшифровка байта таблицы.
+
+    :param code: (int) Байт таблицы
+    :return: (tuple) 'win', 'loss' или 'draw' и число полуходов до мата или None, если позиции нет
+    """
+    if code == MISSING:
+        return None
+    if code == DRAW:
+        return 'draw', 0
+    plies = code - 1
+    return ('loss' if plies % 2 == 0 else 'win'), plies
+
+
+def open_tablebases(directory):
+    """
+    Открытие всех таблиц из каталога.
+
+    :param directory: (str) Каталог с файлами *.mtb
+    :return: (dict) Материал -> таблица
+    """
+    tablebases = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(EXTENSION):
+            table = Tablebase.open(os.path.join(directory, name))
+            tablebases[table.material] = table
+    return tablebases
+
+
+def probe(tablebases, board):
+    """
+    Результат позиции по любой подходящей таблице (позиция с двумя королями - ничья).
+
+    Args:
+        :param tablebases: (dict) Материал -> таблица
+        :param board: (object) Доска
+
+    :return: (tuple) Как у Tablebase.probe или None, если подходящей таблицы нет
+    """
+    material = board_material(board)
+    if material == 'KvK':
+        return 'draw', 0
+    table = tablebases.get(material)
+    return decode(table.code(board)) if table else None
+
+
+def build(material, tablebases=None, log=None):
+    """
+    Подсчёт таблицы ретроградным анализом. Таблицы материала после взятий считаются раньше
+    (и добавляются в tablebases), если их там нет.
+
+    Сначала для каждой позиции генерируются легальные ходы и запоминаются рёбра "позиция -> позиция после хода".
+    Затем от матов идут назад по рёбрам: позиция, из которой есть ход в проигранную, выиграна на полуход дольше;
+    позиция, все ходы из которой ведут в выигранные, проиграна. Что не решилось - ничья.
+
+    Args:
+        :param material: (str) Материал, например 'KGvK'
+        :param tablebases: (dict) Уже посчитанные таблицы: материал -> таблица
+        :param log: (function) Функция для вывода хода подсчёта или None
+
+    :return: (object) Таблица (она же добавляется в tablebases)
+    """
+    tablebases = tablebases if tablebases is not None else {}
+    table = Tablebase(material)
+    for slot in range(1, len(table.pieces)):
+        if table.pieces[slot][0] != King:
+            captured = table.pieces[:slot] + table.pieces[slot + 1:]
+            sub_material = 'v'.join('K' + ''.join(piece_type.letter for piece_type, color in captured[1:]
+                                                  if color == side and piece_type != King)
+                                    for side in ('white', 'black'))
+            sub_material = parse_material(sub_material)[0]
+            if sub_material != 'KvK' and sub_material not in tablebases:
+                tablebases[sub_material] = build(sub_material, tablebases, log)
+
+    started = time.perf_counter()
+    values = table.values
+    counters = array('H', bytes(2 * table.size))
+    sources, targets = array('I'), array('I')
+    # Ходы со взятием ведут в другие таблицы: расстояние до мата -> позиции, у которых есть такой ход
+    captures = {}
+    mated = []
+
+    board = Board(setup=False, cache_size=0)
+    placed = []
+    for index in range(table.size):
+        turn, squares = table.position(index)
+        if len(set(squares)) != len(squares) or table.index(turn, squares) != index:
+            continue
+        for y, x in placed:
+            board.set_square(y, x, None)
+        placed = [SQUARES[square] for square in squares]
+        for (y, x), (piece_type, color) in zip(placed, table.pieces):
+            board.set_square(y, x, piece_type(color))
+        board.state.turn = turn
+        if in_check(board, OTHER_COLOR[turn]):
+            continue
+
+        moves = legal_moves(board, turn)
+        values[index] = UNKNOWN
+        if not moves:
+            if in_check(board, turn):
+                values[index] = 1
+                mated.append(index)
+            else:
+                values[index] = DRAW
+            continue
+        counters[index] = len(moves)
+        for move in moves:
+            board.make_move(*move)
+            if board.occupied.bit_count() == len(table.pieces):
+                sources.append(index)
+                targets.append(table.index(board.state.turn, table.squares(board)))
+            else:
+                result = probe(tablebases, board)
+                if result[0] != 'draw':
+                    captures.setdefault(result[1], []).append(index)
+            board.unmake_move()
+
+    # Обратные рёбра в виде сжатых списков: предшественники позиции i - sources[starts[i]:starts[i + 1]]
+    starts = array('I', bytes(4 * (table.size + 1)))
+    for target in targets:
+        starts[target + 1] += 1
+    for index in range(table.size):
+        starts[index + 1] += starts[index]
+    predecessors = array('I', bytes(4 * len(sources)))
+    filled = array('I', starts)
+    for source, target in zip(sources, targets):
+        predecessors[filled[target]] = source
+        filled[target] += 1
+    del sources, targets, filled
+
+    frontier = mated
+    distance = 0
+    while frontier or any(plies >= distance for plies in captures):
+        # Позиции на расстоянии distance: проигранные при чётном, выигранные при нечётном
+        lost = distance % 2 == 0
+        found = []
+        children = [predecessors[starts[child]:starts[child + 1]] for child in frontier]
+        children.append(captures.pop(distance, ()))
+        for parents in children:
+            for parent in parents:
+                if values[parent] != UNKNOWN:
+                    continue
+                if not lost:
+                    counters[parent] -= 1
+                    if counters[parent]:
+                        continue
+                values[parent] = distance + 2
+                found.append(parent)
+        frontier = found
+        distance += 1
+
+    for index in range(table.size):
+        if values[index] == UNKNOWN:
+            values[index] = DRAW
+    tablebases[table.material] = table
+    if log:
+        longest = f'самый длинный мат - {distance - 1} полуходов' if distance else 'матов нет'
+        log(f'{table.material}: {time.perf_counter() - started:.1f} s, {longest}')
+    return table
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Подсчёт таблиц эндшпилей без пешек.')
+    parser.add_argument('materials', nargs='*', default=['KGvK', 'KJvK', 'KMvK'],
+                        help='материал, например KGvK (по умолчанию KGvK KJvK KMvK)')
+    parser.add_argument('--directory', default='tablebases', help='каталог для файлов таблиц')
+    arguments = parser.parse_args()
+    os.makedirs(arguments.directory, exist_ok=True)
+    tables = {}
+    for name in arguments.materials:
+        if parse_material(name)[0] not in tables:
+            build(name, tables, print)
+    for material, table in tables.items():
+        table.save(os.path.join(arguments.directory, material + EXTENSION))
@@ -0,0 +1,35 @@
+"""
+Общие помощники тестов. Модули лежат в корне репозитория, а не в пакете, поэтому корень добавляется в sys.path.
+
+Запуск: python -m pytest tests
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board import Board, START_FEN
+from movegen import generate_moves
+
+
+def play_random(seed, plies, legal=False):
+    """
+    Доска после случайной партии из стартовой позиции.
+
+    Args:
+        :param seed: (int) Зерно генератора
+        :param plies: (int) Наибольшее число полуходов (партия кончается раньше, если ходов нет)
+        :param legal: (bool) Выбирать только легальные ходы (иначе - псевдолегальные, как в perft)
+
+    :return: (object) Доска
+    """
+    generator = random.Random(seed)
+    board = Board.from_fen(START_FEN)
+    for _ in range(plies):
+        moves = board.legal_moves() if legal else generate_moves(board, board.state.turn)
+        if not moves:
+            break
+        board.make_move(*generator.choice(moves))
+    return board
+
@@ -0,0 +1,17 @@
+"""
+Пакетная оценка на NumPy против скалярной логики pieces.py (как python batch.py).
+"""
+import pytest
+
+pytest.importorskip('numpy')
+
+import batch
+
+
+def test_batch_matches_scalar_features():
+    boards = batch.random_boards(60)
+    features = batch.evaluate(boards)
+    for index, board in enumerate(boards):
+        got = (int(features['material'][index]), tuple(features['attacked'][index].tolist()),
+               tuple(features['threatened'][index].tolist()), tuple(features['mobility'][index].tolist()))
+        assert got == batch.scalar_features(board), board.to_fen()
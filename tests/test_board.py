@@ -0,0 +1,112 @@
+"""
+Доска: make_move/unmake_move, записи FEN и двоичная, снимки и копии.
+"""
+import random
+
+import pytest
+
+from board import Board, BINARY_SIZE, START_FEN
+from conftest import play_random
+from movegen import generate_moves
+
+SEEDS = range(8)
+
+
+def state(board):
+    """
+    Всё, что должно вернуться после отмены хода.
+    """
+    return ([row[:] for row in board.board], dict(board.bitboards), dict(board.colors), board.occupied,
+            board.state.turn, board.state.en_passant, board.state.move_count)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_make_unmake_round_trip(seed):
+    generator = random.Random(seed)
+    board = Board.from_fen(START_FEN)
+    states = []
+    for _ in range(100):
+        moves = generate_moves(board, board.state.turn)
+        if not moves:
+            break
+        states.append(state(board))
+        board.make_move(*generator.choice(moves))
+    while states:
+        board.unmake_move()
+        assert state(board) == states.pop()
+    assert board.to_fen() == START_FEN
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_fen_round_trip(seed):
+    board = play_random(seed, 60)
+    loaded = Board.from_fen(board.to_fen())
+    assert loaded.to_fen() == board.to_fen()
+    assert loaded.hash == board.hash
+    assert loaded.score == board.score
+    assert sorted(loaded.legal_moves()) == sorted(board.legal_moves())
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_bytes_round_trip(seed):
+    board = play_random(seed, 60)
+    data = board.to_bytes()
+    assert len(data) == BINARY_SIZE
+    loaded = Board.from_bytes(data)
+    assert loaded.to_fen() == board.to_fen()
+    assert loaded.hash == board.hash
+
+
+@pytest.mark.parametrize('fen', [
+    '',
+    'rnbqkbnr/jppppppj/g1m2m1g/8/8/G1M2M1G/JPPPPPPJ/RNBQKBNR w -',
+    'rnbqkbnr/jppppppj/g1m2m1g/8/8/G1M2M1G/JPPPPPPJ w - 0',
+    'rnbqkbnr/jppppppj/g1m2m1g/9/8/G1M2M1G/JPPPPPPJ/RNBQKBNR w - 0',
+    'rnbqkbnr/jppppppj/g1m2m1g/7/8/G1M2M1G/JPPPPPPJ/RNBQKBNR w - 0',
+    'rnbqkbnr/jppppppj/g1m2m1g/8/8/G1M2M1G/JPPPPPPPJ/RNBQKBNR w - 0',
+    'rnbxkbnr/jppppppj/g1m2m1g/8/8/G1M2M1G/JPPPPPPJ/RNBQKBNR w - 0',
+    'rnbqkbnr/jppppppj/g1m2m1g/8/8/G1M2M1G/JPPPPPPJ/RNBQKBNR x - 0',
+    'rnbqkbnr/jppppppj/g1m2m1g/8/8/G1M2M1G/JPPPPPPJ/RNBQKBNR w e5 0',
+    'rnbqkbnr/jppppppj/g1m2m1g/8/8/G1M2M1G/JPPPPPPJ/RNBQKBNR w - -1',
+])
+def test_from_fen_rejects_malformed_records(fen):
+    with pytest.raises(ValueError):
+        Board.from_fen(fen)
+
+
+def test_from_bytes_rejects_malformed_records():
+    data = Board.from_fen(START_FEN).to_bytes()
+    for bad in (data[:-1], data + b'\0', b'\xff' + data[1:], data[:40] + b'\x20' + data[41:],
+                data[:40] + b'\x04' + data[41:]):
+        with pytest.raises(ValueError):
+            Board.from_bytes(bad)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_snapshot_restore(seed):
+    board = play_random(seed, 30)
+    fen, key, moves, depth = board.to_fen(), board.hash, board.legal_moves(), len(board.move_stack)
+    snapshot = board.snapshot()
+    generator = random.Random(seed)
+    for _ in range(10):
+        choices = board.legal_moves()
+        if not choices:
+            break
+        board.make_move(*generator.choice(choices))
+    board.restore(snapshot)
+    assert (board.to_fen(), board.hash, board.legal_moves(), len(board.move_stack)) == (fen, key, moves, depth)
+    assert board.attack_map('white') == Board.from_fen(fen).attack_map('white')
+    # После восстановления отмена ходов работает как обычно
+    while board.move_stack:
+        board.unmake_move()
+    assert board.to_fen() == START_FEN
+
+
+def test_copy_is_independent():
+    board = play_random(1, 20)
+    fen = board.to_fen()
+    copy = board.copy()
+    copy.make_move(*copy.legal_moves()[0])
+    assert board.to_fen() == fen
+    copy.unmake_move()
+    assert copy.to_fen() == fen and copy.hash == board.hash
@@ -0,0 +1,27 @@
+"""
+Дебютная книга: записанные в файл ходы и оценки (в том числе оценки матов) читаются обратно без изменений.
+"""
+import pytest
+
+from book import OpeningBook, save
+from conftest import play_random
+from engine import MATE
+
+
+def test_save_and_lookup_round_trip(tmp_path):
+    boards = [play_random(seed, plies) for seed, plies in enumerate(range(6))]
+    scores = [0, -37, 2500, MATE - 1, -MATE + 4, MATE - 999]
+    entries = {board.hash: (board.legal_moves()[0], score) for board, score in zip(boards, scores)}
+    save(entries, tmp_path / 'book.bin')
+    book = OpeningBook.open(tmp_path / 'book.bin')
+    assert len(book) == len(entries)
+    for board in boards:
+        assert book.lookup(board) == entries[board.hash]
+    assert book.lookup(play_random(10, 7)) is None
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / 'book.bin'
+    path.write_bytes(b'MBK1' + bytes(4))
+    with pytest.raises(ValueError):
+        OpeningBook.open(path)
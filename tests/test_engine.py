@@ -0,0 +1,56 @@
+"""
+Движок: оценки матов в таблице транспозиций, маты в переборе взятий, поиск мата в один ход,
+старение таблиц процессов-исполнителей.
+"""
+import engine
+from board import Board
+from engine import EXACT, MATE, Engine, TranspositionTable
+from movegen import in_check
+
+# Чёрные матуют ходом ниндзя h7-h5
+MATE_IN_ONE = 'rnbqkbnr/1ppp1p1j/1Gm1p1pg/j3Gm2/8/2N1PK2/JBPP1PPJ/RM1QMBNR b - 15'
+MATING_MOVE = ((1, 7), (3, 7), None)
+
+
+def test_table_stores_mate_distance_from_node():
+    table = TranspositionTable(16)
+    # Мат через 2 полухода от позиции, которая на 3 полухода от корня
+    table.put(5, 3, -MATE + 5, EXACT, None, 3)
+    assert table.get(5, 3)[2] == -MATE + 5
+    # Та же позиция на расстоянии 1 от корня - мат ближе к корню
+    assert table.get(5, 1)[2] == -MATE + 3
+    table.put(6, 3, 120, EXACT, None, 3)
+    assert table.get(6, 1)[2] == 120
+
+
+def test_quiescence_scores_checkmate():
+    board = Board.from_fen(MATE_IN_ONE)
+    board.make_move(*MATING_MOVE)
+    assert in_check(board, board.state.turn) and not board.legal_moves()
+    assert Engine(time_limit=None).quiescence(board, -MATE, MATE, 3) == -MATE + 3
+
+
+def test_search_finds_mate_in_one():
+    board = Board.from_fen(MATE_IN_ONE)
+    move, score, _ = Engine(time_limit=None, max_depth=3).search(board)
+    assert score == MATE - 1
+    board.make_move(*move)
+    assert in_check(board, board.state.turn) and not board.legal_moves()
+
+
+def test_search_is_repeatable_with_filled_table():
+    board = Board.from_fen(MATE_IN_ONE)
+    player = Engine(time_limit=None, max_depth=3)
+    first = player.search(board)
+    assert player.search(board)[1:] == first[1:]
+
+
+def test_worker_table_ages_with_new_search_id():
+    data = Board().to_bytes()
+    move = ((6, 4), (4, 4), None)
+    engine._search_root_move(data, move, 1, None, 'first')
+    generation = engine._worker_engine.table.generation
+    engine._search_root_move(data, move, 1, None, 'first')
+    assert engine._worker_engine.table.generation == generation
+    engine._search_root_move(data, move, 1, None, 'second')
+    assert engine._worker_engine.table.generation == generation + 1
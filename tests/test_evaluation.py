@@ -0,0 +1,16 @@
+"""
+Оценка позиции: обновляемая по ходам оценка совпадает с посчитанной заново и возвращается после отмены ходов.
+"""
+import pytest
+
+from conftest import play_random
+from evaluation import scan
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_incremental_score_matches_scan(seed):
+    board = play_random(seed, 100)
+    assert board.score == scan(board)
+    while board.move_stack:
+        board.unmake_move()
+        assert board.score == scan(board)
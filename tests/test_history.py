@@ -0,0 +1,69 @@
+"""
+История ходов: записи, отмена, троекратное повторение и двоичная запись партии.
+"""
+import pytest
+
+from board import Board, START_FEN
+from conftest import play_random
+from history import MoveHistory
+from main import Game
+
+# Конь h3 и конь h6 ходят туда и обратно
+SHUFFLE = [('h3', 'g5'), ('h6', 'g4'), ('g5', 'h3'), ('g4', 'h6')]
+
+
+def test_game_records_and_threefold_repetition():
+    game = Game()
+    for start, end in SHUFFLE:
+        game.play(start, end)
+    assert game.move_history[0] == (1, 'h3', 'g5', 'white', None, '')
+    assert game.move_history.repetitions() == 2 and game.status() is None
+    for start, end in SHUFFLE:
+        game.play(start, end)
+    assert game.move_history.repetitions() == 3 and game.status() == 'repetition'
+
+    assert game.undo() == [(8, 'g4', 'h6', 'black', None, '')]
+    assert len(game.move_history) == 7 and game.status() is None
+
+
+def history_of(board):
+    """
+    История партии, сыгранной на доске (по board.move_stack), с хэшами позиций после каждого хода.
+    """
+    replayed = Board.from_fen(START_FEN)
+    history = MoveHistory(replayed.hash)
+    for start, end, _, captured, captured_at, promotion, _, _ in board.move_stack:
+        color = replayed.state.turn
+        replayed.make_move(start, end, promotion)
+        history.append((start, end, promotion), captured, color, replayed.hash, captured_at != end)
+    return history
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_bytes_round_trip_replays_the_game(seed):
+    board = play_random(seed, 80, legal=True)
+    history = history_of(board)
+    loaded = MoveHistory.from_bytes(history.to_bytes())
+    assert list(loaded) == list(history)
+    assert loaded.counts == history.counts
+    replayed = Board.from_fen(START_FEN)
+    for move in loaded.moves():
+        replayed.make_move(*move)
+    assert replayed.hash == board.hash
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_pop_restores_repetition_counts(seed):
+    board = play_random(seed, 80, legal=True)
+    history = history_of(board)
+    while history:
+        history.pop()
+        board.unmake_move()
+        assert history.current_hash == board.hash
+    assert history.counts == {board.hash: 1}
+
+
+@pytest.mark.parametrize('data', [b'', b'MHS1', b'MBK1' + bytes(12), b'MHS1' + bytes((1,)) + bytes(11)])
+def test_from_bytes_rejects_other_data(data):
+    with pytest.raises(ValueError):
+        MoveHistory.from_bytes(data)
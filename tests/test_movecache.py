@@ -0,0 +1,21 @@
+"""
+Кэш ходов: ходы фигур и легальные ходы из кэша совпадают с посчитанными напрямую, кэш не растёт сверх размера.
+"""
+import pytest
+
+from conftest import play_random
+from movegen import legal_moves
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_move_cache_matches_direct_generation(seed):
+    board = play_random(seed, 40)
+    for y in range(8):
+        for x in range(8):
+            piece = board.board[y][x]
+            expected = tuple(piece.get_possible_moves(board, (y, x))) if piece else ()
+            assert board.possible_moves((y, x)) == expected
+            # Второй запрос берётся из кэша и должен совпасть с первым
+            assert board.possible_moves((y, x)) == expected
+    assert board.legal_moves() == tuple(legal_moves(board))
+    assert len(board.move_cache.entries) <= board.move_cache.size
@@ -0,0 +1,20 @@
+"""
+Легальные ходы movegen против псевдолегальных ходов, после которых свой король не под боем.
+"""
+import pytest
+
+from conftest import play_random
+from movegen import generate_moves, in_check, legal_moves
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_legal_moves_match_make_and_check(seed):
+    board = play_random(seed, 40)
+    color = board.state.turn
+    expected = []
+    for move in generate_moves(board, color):
+        board.make_move(*move)
+        if not in_check(board, color):
+            expected.append(move)
+        board.unmake_move()
+    assert sorted(legal_moves(board, color)) == sorted(expected)
@@ -0,0 +1,16 @@
+"""
+Perft по сохранённым позициям perft.py на глубинах 1-2 (глубина 3 - в python perft.py --check).
+"""
+import pytest
+
+from board import Board
+from perft import POSITIONS, REFERENCE, perft
+
+
+@pytest.mark.parametrize('depth', (1, 2))
+@pytest.mark.parametrize('name, fen', POSITIONS, ids=[name for name, _ in POSITIONS])
+def test_perft_reference(name, fen, depth):
+    board = Board.from_fen(fen)
+    assert perft(board, depth) == REFERENCE[name][depth - 1]
+    # perft делает и отменяет ходы - позиция должна остаться прежней
+    assert board.to_fen() == fen
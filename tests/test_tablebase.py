@@ -0,0 +1,67 @@
+"""
+Таблицы эндшпилей: результат каждой позиции согласован с результатами позиций после её ходов,
+запись в файл и открытие через mmap ничего не меняют. Таблица KMvK считается один раз (несколько секунд).
+"""
+import random
+
+import pytest
+
+import tablebase
+from board import Board
+from movegen import OTHER_COLOR, in_check, legal_moves
+
+
+@pytest.fixture(scope='module')
+def tables():
+    tables = {}
+    tablebase.build('KMvK', tables)
+    return tables
+
+
+def random_positions(table, count, seed=0):
+    """
+    Случайные расстановки материала таблицы, где того, кто не ходит, не бьют.
+    """
+    generator = random.Random(seed)
+    while count:
+        board = Board(setup=False, cache_size=0)
+        for square, (piece_type, color) in zip(generator.sample(range(64), len(table.pieces)), table.pieces):
+            board.set_square(square >> 3, square & 7, piece_type(color))
+        board.state.turn = generator.choice(('white', 'black'))
+        if not in_check(board, OTHER_COLOR[board.state.turn]):
+            count -= 1
+            yield board
+
+
+def test_results_agree_with_one_ply_search(tables):
+    table = tables['KMvK']
+    outcomes = set()
+    for board in random_positions(table, 400):
+        result = table.probe(board)
+        outcomes.add(result[0])
+        moves = legal_moves(board)
+        if not moves:
+            expected = ('loss', 0) if in_check(board, board.state.turn) else ('draw', 0)
+        else:
+            children = []
+            for move in moves:
+                board.make_move(*move)
+                children.append(tablebase.probe(tables, board))
+                board.unmake_move()
+            losses = [plies for outcome, plies in children if outcome == 'loss']
+            if losses:
+                expected = ('win', min(losses) + 1)
+            elif all(outcome == 'win' for outcome, _ in children):
+                expected = ('loss', max(plies for _, plies in children) + 1)
+            else:
+                expected = ('draw', 0)
+        assert result == expected, board.to_fen()
+    assert 'win' in outcomes
+
+
+def test_save_and_open(tables, tmp_path):
+    table = tables['KMvK']
+    table.save(tmp_path / 'KMvK.mtb')
+    opened = tablebase.open_tablebases(tmp_path)
+    for board in random_positions(table, 100, seed=1):
+        assert tablebase.probe(opened, board) == table.probe(board)
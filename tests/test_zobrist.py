@@ -0,0 +1,16 @@
+"""
+Хэш Зобриста: обновляемый по ходам хэш совпадает с посчитанным заново и возвращается после отмены ходов.
+"""
+import pytest
+
+from conftest import play_random
+from zobrist import compute_hash
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_incremental_hash_matches_full_hash(seed):
+    board = play_random(seed, 100)
+    assert board.hash == compute_hash(board)
+    while board.move_stack:
+        board.unmake_move()
+        assert board.hash == compute_hash(board)
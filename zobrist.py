@@ -0,0 +1,49 @@
+"""
+Хэширование позиций по Зобристу: каждой фигуре (тип, цвет) на каждой клетке, ходу чёрных и столбцу пешки,
+которую можно взять на проходе, соответствует случайное 64-битное число. Хэш позиции - XOR этих чисел,
+поэтому при ходе его можно обновлять, а не считать заново.
+"""
+import random
+
+from pieces import Pawn, Rook, Knight, Bishop, Queen, King, Mimic, Pegasus, Ninja
+
+# Фиксированное зерно, чтобы хэши совпадали между запусками и процессами
+_generator = random.Random(0x5EED)
+
+PIECE_KEYS = {(piece_type, color): tuple(_generator.getrandbits(64) for _ in range(64))
+              for piece_type in (Pawn, Rook, Knight, Bishop, Queen, King, Mimic, Pegasus, Ninja)
+              for color in ('white', 'black')}
+BLACK_TO_MOVE = _generator.getrandbits(64)
+EN_PASSANT_KEYS = tuple(_generator.getrandbits(64) for _ in range(8))
+
+
+def state_key(state):
+    """
+    Часть хэша, которая зависит от состояния партии (кто ходит и взятие на проходе).
+
+    Args:
+        :param state: (object) Состояние доски (BoardState)
+
+    :return: (int) Часть хэша
+    """
+    key = BLACK_TO_MOVE if state.turn == 'black' else 0
+    if state.en_passant:
+        key ^= EN_PASSANT_KEYS[state.en_passant[1]]
+    return key
+
+
+def compute_hash(board):
+    """
+    Полный подсчёт хэша позиции (обычно хэш обновляется по ходу, это нужно для проверки и загрузки позиций).
+
+    Args:
+        :param board: (object) Текущее состояние доски
+
+    :return: (int) Хэш позиции
+    """
+    key = state_key(board.state)
+    for index0, row in enumerate(board.board):
+        for index1, piece in enumerate(row):
+            if piece:
+                key ^= PIECE_KEYS[type(piece), piece.color][index0 * 8 + index1]
+    return key